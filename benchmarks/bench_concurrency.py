@@ -0,0 +1,91 @@
+"""
+Load test: update throughput vs. worker limit with per-chat ordering
+Simulates many users each sending a burst of messages through
+PerChatUpdateProcessor. Every handler awaits a simulated I/O delay (like a
+storage write or an API call). Throughput should scale with the worker limit
+while each chat's updates are still handled strictly in order.
+
+Usage: python benchmarks/bench_concurrency.py [--users 200] [--messages 5] [--delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update  # noqa: E402
+
+from update_processor import PerChatUpdateProcessor  # noqa: E402
+
+
+def make_update(update_id, chat_id, seq):
+    return Update.de_json(
+        {
+            'update_id': update_id,
+            'message': {
+                'message_id': seq,
+                'date': 0,
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+                'text': str(seq),
+            },
+        },
+        None,
+    )
+
+
+async def run(workers, users, messages, delay):
+    processor = PerChatUpdateProcessor(workers)
+    await processor.initialize()
+    seen = {chat_id: [] for chat_id in range(1, users + 1)}
+    running = {}
+    violations = 0
+
+    async def handler(update):
+        nonlocal violations
+        chat_id = update.effective_chat.id
+        if running.get(chat_id):
+            violations += 1
+        running[chat_id] = True
+        await asyncio.sleep(delay)
+        seen[chat_id].append(update.message.message_id)
+        running[chat_id] = False
+
+    updates = [
+        make_update(i, chat_id, seq)
+        for i, (seq, chat_id) in enumerate(
+            ((seq, chat_id) for seq in range(messages) for chat_id in range(1, users + 1))
+        )
+    ]
+    start = time.perf_counter()
+    # Same as Application with concurrent updates: one task per update, in arrival order
+    await asyncio.gather(*(processor.process_update(u, handler(u)) for u in updates))
+    elapsed = time.perf_counter() - start
+    await processor.shutdown()
+
+    in_order = all(ids == list(range(messages)) for ids in seen.values())
+    return len(updates) / elapsed, in_order and violations == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=5)
+    parser.add_argument('--delay-ms', type=float, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 64, 256])
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.messages} messages, {args.delay_ms:.0f} ms per handler")
+    print(f"{'workers':>8} {'updates/s':>10} {'speedup':>8} {'per-chat order':>15}")
+    baseline = None
+    for workers in args.workers:
+        throughput, ordered = asyncio.run(run(workers, args.users, args.messages, args.delay_ms / 1000))
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.0f} {throughput / baseline:>7.1f}x {'ok' if ordered else 'VIOLATED':>15}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+"""
+Load test: the whole bot under thousands of concurrent users, no network
+Builds the real Application from bot.py and replays a fixed, seeded script:
+every user either orders (/start → 📦 Place Order → product → quantity →
+maybe a second product → ✅ Checkout → ✅ Confirm Order, or with --bulk-share
+the whole list typed in one message) or asks FAQ questions (exact, fuzzy and
+unanswerable ones). Updates go through the same per-chat
+update processor as in production; the Bot API is a fake Telegram that answers
+instantly (or after --api-latency-ms), and order emails go to a local SMTP
+stand-in. Orders, carts and conversation states are stored in SQLite files in
+a temporary directory, so storage regressions show up in the numbers.
+
+Reports throughput, p50/p95/p99 latency per step (from the moment the update
+is handed to the bot until its handler finished) and peak memory. Runs with
+the same --seed replay the same updates, so --json results from two commits
+can be compared with --baseline.
+
+Usage: python benchmarks/bench_conversation.py [--users 2000] [--faq-share 0.3] [--json results.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import resource
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+from bench_order_ids import percentile  # noqa: E402
+from bulk_order import normalize  # noqa: E402
+
+BOT_ID = 1
+
+
+class FakeTelegram(BaseRequest):
+    """
+    Stands in for the Bot API: every call succeeds after `latency` seconds.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}  # endpoint -> count
+        self.message_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 5
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if endpoint == 'getMe':
+            result = {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif 'chat_id' in params and endpoint.startswith(('send', 'edit')):
+            result = {
+                'message_id': next(self.message_ids), 'date': 0,
+                'chat': {'id': int(params['chat_id']), 'type': 'private'}, 'text': params.get('text', ''),
+            }
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL/RCPT/DATA, RSET, NOOP, QUIT.
+    """
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 bench ESMTP')
+        for raw in self.rfile:
+            command = raw.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.wfile.write(b'250-bench\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif command.startswith('AUTH'):
+                self.reply('235 2.7.0 Authentication successful')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class LocalSMTP(socketserver.ThreadingTCPServer):
+    """
+    SMTP stand-in on 127.0.0.1 (random port) that counts received emails.
+    Each email takes `latency` seconds, like a real server round trip.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.latency = latency
+        self.received = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def configure(workdir, smtp_port, args):
+    """
+    Point bot.py's configuration at the temporary directory and the local
+    stand-ins. Must run before bot.py (and config.py) is imported.
+    """
+    os.environ.update(
+        BOT_TOKEN=f'{BOT_ID}:bench',
+        OWNER_CHAT_ID='999999',
+        ORDERS_DB=os.path.join(workdir, 'orders.db'),
+        STATE_DB=os.path.join(workdir, 'state.db'),
+        CATALOG_FILE=args.catalog,
+        FAQ_FILE=os.path.join(workdir, 'faq.json'),
+        FAQ_INDEX_CACHE=os.path.join(workdir, 'faq_index.npz'),
+        SMTP_SERVER='127.0.0.1',
+        SMTP_PORT=str(smtp_port),
+        SMTP_STARTTLS='false',
+        EMAIL_PASSWORD='bench',
+        SUPPORT_EMAIL='shop@example.com',
+        ORDER_NOTIFICATION_EMAIL='owner@example.com',
+        METRICS_PORT='0',
+        UPDATE_WORKERS=str(args.workers),
+        # Telegram's send limits would dominate every number here;
+        # bench_rate_limiter.py measures the limiter on its own
+        TELEGRAM_MESSAGES_PER_SECOND='1000000',
+        CHAT_MESSAGES_PER_SECOND='1000000',
+        OWNER_MESSAGES_PER_MINUTE='1000000',
+        CATALOG_RELOAD_INTERVAL='0',
+        FAQ_RELOAD_INTERVAL='0',
+        EXCEL_EXPORT_INTERVAL='0',
+    )
+    os.chdir(workdir)
+
+
+def make_scripts(bot, args):
+    """
+    The seeded replay: one list of (step, text or ('callback', data)) per user.
+    """
+    rng = random.Random(args.seed)
+    products = list(bot.catalog.snapshot.products)
+    questions = list(bot.faq_matcher.faqs)
+    scripts = []
+    for _ in range(args.users):
+        if rng.random() < args.faq_share:
+            script = []
+            for _ in range(args.faq_questions):
+                question = rng.choice(questions)
+                kind = rng.choice(('exact', 'fuzzy', 'miss'))
+                if kind == 'exact':
+                    text = f"Hi, what is your {question}?"
+                elif kind == 'fuzzy':
+                    # Drop a letter from one word, like a typo
+                    words = question.split()
+                    i = rng.randrange(len(words))
+                    cut = rng.randrange(len(words[i]))
+                    words[i] = words[i][:cut] + words[i][cut + 1:]
+                    text = ' '.join(words) + '?'
+                else:
+                    text = f"hello there {rng.randrange(10**6)}"
+                script.append(('faq', text))
+        elif args.bulk_share and rng.random() < args.bulk_share:
+            # The whole order typed as one list
+            picked = rng.sample(products, rng.randint(1, 4))
+            text = ', '.join(f"{rng.randint(1, 3)} {normalize(product.label)}" for product in picked)
+            script = [('start', '/start'), ('place_order', '📦 Place Order'), ('bulk_list', text),
+                      ('confirm', '✅ Confirm Order')]
+        else:
+            script = [('start', '/start'), ('place_order', '📦 Place Order')]
+            for n in range(rng.choice((1, 1, 2))):
+                if n:
+                    script.append(('add_more', '➕ Add More Items'))
+                script.append(('pick_product', ('callback', f"pk:{rng.choice(products).sku}")))
+                script.append(('quantity', str(rng.randint(1, 3))))
+            script += [('checkout', '✅ Checkout'), ('confirm', '✅ Confirm Order')]
+        scripts.append(script)
+    return scripts
+
+
+def make_update(update_ids, user_id, text):
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'Load', 'username': f'load{user_id}'}
+    message = {
+        'message_id': next(update_ids), 'date': 0, 'chat': {'id': user_id, 'type': 'private'}, 'from': user,
+    }
+    if isinstance(text, tuple):
+        message.update(text='🛒', **{'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench'}})
+        callback = {'id': str(next(update_ids)), 'from': user, 'chat_instance': 'bench', 'data': text[1],
+                    'message': message}
+        return {'update_id': next(update_ids), 'callback_query': callback}
+    message['text'] = text
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+    return {'update_id': next(update_ids), 'message': message}
+
+
+async def replay(application, scripts, args):
+    """
+    Run every user's script concurrently; each user waits for the bot to
+    finish one update (plus think time) before sending the next, like a
+    person in a chat. Returns {step: [latency seconds]} and the elapsed time.
+    """
+    processor = application.update_processor
+    update_ids = itertools.count(1)
+    latencies = {}
+    rng = random.Random(args.seed + 1)
+    think = [[rng.random() * args.think_ms / 1000 for _ in script] for script in scripts]
+
+    async def user(user_id, script, pauses):
+        # Spread the arrivals a little so not every user hits /start in the same tick
+        await asyncio.sleep(pauses[0])
+        for (step, text), pause in zip(script, pauses):
+            update = Update.de_json(make_update(update_ids, user_id, text), application.bot)
+            start = time.perf_counter()
+            await processor.process_update(update, application.process_update(update))
+            latencies.setdefault(step, []).append(time.perf_counter() - start)
+            await asyncio.sleep(pause)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        user(user_id, script, pauses)
+        for user_id, (script, pauses) in enumerate(zip(scripts, think), start=1)
+    ))
+    return latencies, time.perf_counter() - start
+
+
+async def run(args, smtp):
+    import bot
+
+    bot.customer_store.load()
+    telegram = FakeTelegram(args.api_latency_ms / 1000)
+    application = bot.build_application(request=telegram)
+    scripts = make_scripts(bot, args)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    latencies, elapsed = await replay(application, scripts, args)
+    stopping = time.perf_counter()
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    # Waits for queued emails and storage jobs, so their cost is part of the run
+    await application.post_shutdown(application)
+    drained = time.perf_counter()
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    tracemalloc.stop()
+
+    conn = bot.order_journal._connect()
+    orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    updates = sum(len(samples) for samples in latencies.values())
+    every = [sample for samples in latencies.values() for sample in samples]
+    return {
+        'commit': git_commit(),
+        'users': args.users,
+        'seed': args.seed,
+        'updates': updates,
+        'elapsed_s': round(elapsed, 3),
+        'updates_per_s': round(updates / elapsed, 1),
+        'orders': orders,
+        'orders_expected': sum(1 for script in scripts if script[-1][0] == 'confirm'),
+        'emails': smtp.received,
+        'api_calls': sum(telegram.calls.values()),
+        'latency_ms': {
+            step: summarize(samples) for step, samples in [('all', every)] + sorted(latencies.items())
+        },
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'traced_peak_mb': round(traced_peak / 2**20, 1) if traced_peak is not None else None,
+        'shutdown_s': round(drained - stopping, 3),
+    }
+
+
+def summarize(samples):
+    return {
+        'count': len(samples),
+        'p50': round(percentile(samples, 50) * 1000, 2),
+        'p95': round(percentile(samples, 95) * 1000, 2),
+        'p99': round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def change(new, old):
+    if not old:
+        return ''
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def report(results, baseline):
+    base = baseline or {}
+    print(f"{results['users']} users (seed {results['seed']}), commit {results['commit'] or '?'}"
+          + (f", baseline {base.get('commit') or '?'}" if baseline else ''))
+    if baseline and (base.get('users'), base.get('seed')) != (results['users'], results['seed']):
+        print(f"  ⚠️ baseline replayed {base.get('users')} users with seed {base.get('seed')}: not comparable")
+    print(f"  updates:      {results['updates']} in {results['elapsed_s']:.2f}s, "
+          f"{results['updates_per_s']:.0f}/s{change(results['updates_per_s'], base.get('updates_per_s'))}")
+    print(f"  orders:       {results['orders']} stored (expected {results['orders_expected']}), "
+          f"{results['emails']} emails, {results['api_calls']} Bot API calls")
+    print(f"  peak memory:  {results['peak_rss_mb']:.0f} MB RSS{change(results['peak_rss_mb'], base.get('peak_rss_mb'))}"
+          + (f", {results['traced_peak_mb']:.0f} MB traced" if results['traced_peak_mb'] is not None else ''))
+    print(f"  {'latency ms':<14} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    base_latency = base.get('latency_ms', {})
+    for step, stats in results['latency_ms'].items():
+        old = base_latency.get(step, {})
+        print(f"  {step:<14} {stats['count']:>7} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f}"
+              f"{change(stats['p99'], old.get('p99'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--faq-share', type=float, default=0.3, help="fraction of users asking FAQs instead of ordering")
+    parser.add_argument('--faq-questions', type=int, default=3)
+    parser.add_argument('--bulk-share', type=float, default=0, help="fraction of ordering users typing one list")
+    parser.add_argument('--think-ms', type=float, default=50, help="max random pause between a user's messages")
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--api-latency-ms', type=float, default=0)
+    parser.add_argument('--smtp-latency-ms', type=float, default=0)
+    parser.add_argument('--catalog', default=os.path.join(REPO, 'products.json'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tracemalloc', action='store_true', help="also trace Python allocations (slower)")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="results file of an earlier run to compare with")
+    args = parser.parse_args()
+    args.catalog = os.path.abspath(args.catalog)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    # Per-order log lines would swamp the report
+    logging.basicConfig(level=logging.ERROR)
+    smtp = LocalSMTP(args.smtp_latency_ms / 1000)
+    with tempfile.TemporaryDirectory() as workdir:
+        configure(workdir, smtp.port, args)
+        results = asyncio.run(run(args, smtp))
+        os.chdir(REPO)
+    smtp.shutdown()
+
+    report(results, baseline)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
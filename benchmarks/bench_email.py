@@ -0,0 +1,186 @@
+"""
+Harness: order email delivery through EmailNotifier against a local SMTP server
+Runs aiosmtpd's Controller on localhost and drives the real EmailNotifier and
+SMTPSession (no TLS, no login) through three scenarios:
+
+  burst      many orders queued at once go out in batches over one session
+  idle       a session idle longer than SMTP_IDLE_TIMEOUT is reopened
+  failure    the server answers 451 to the first DATA commands; the batch is
+             retried with exponential backoff until it is delivered
+
+Each scenario prints what the server saw and exits non-zero if a check fails.
+
+Usage: python benchmarks/bench_email.py [--burst 50] [--batch-size 20] [--failures 3]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from io_pool import BlockingIOPool  # noqa: E402
+from notifications import SMTPSession, EmailNotifier  # noqa: E402
+
+
+class RecordingHandler:
+    """
+    Accepts every message and records which connection it arrived on. The
+    first `failures` DATA commands are answered with a temporary error.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.messages = []  # (time, connection peer, subject)
+        self.rejected = []  # (time, connection peer) of each refused DATA command
+
+    async def handle_DATA(self, server, session, envelope):
+        now = time.monotonic()
+        if self.failures:
+            self.failures -= 1
+            self.rejected.append((now, session.peer))
+            return '451 4.3.0 Temporary failure, try again later'
+        subject = next((line for line in envelope.content.decode().splitlines() if line.startswith('Subject:')), '')
+        self.messages.append((now, session.peer, subject[len('Subject: '):]))
+        return '250 Message accepted for delivery'
+
+    @property
+    def connections(self):
+        return len({peer for _, peer, _ in self.messages})
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_message(number):
+    msg = EmailMessage()
+    msg['Subject'] = f"Order #{number}"
+    msg['From'] = 'shop@example.com'
+    msg['To'] = 'owner@example.com'
+    msg.set_content(f"Order {number}")
+    return msg
+
+
+class Scenario:
+    """
+    One SMTP server plus one EmailNotifier pointed at it.
+    """
+
+    def __init__(self, args, failures=0, idle_timeout=60):
+        self.handler = RecordingHandler(failures)
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=free_port())
+        self.pool = BlockingIOPool('smtp', 1)
+        self.notifier = EmailNotifier(
+            SMTPSession('127.0.0.1', self.controller.port, starttls=False, timeout=5, idle_timeout=idle_timeout),
+            self.pool,
+            batch_size=args.batch_size,
+            batch_window=0.05,
+            max_retries=args.failures + 2,
+            backoff_base=args.backoff,
+        )
+
+    async def __aenter__(self):
+        self.controller.start()
+        await self.notifier.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.notifier.stop(timeout=30)
+        self.controller.stop()
+        self.pool.shutdown()
+
+
+def check(label, ok):
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+    return ok
+
+
+async def burst(args):
+    print(f"burst: {args.burst} emails queued at once, batch size {args.batch_size}")
+    async with Scenario(args) as scenario:
+        start = time.monotonic()
+        for number in range(args.burst):
+            scenario.notifier.enqueue(make_message(number))
+        await scenario.notifier._queue.join()
+        elapsed = time.monotonic() - start
+        sends = scenario.pool.completed
+    handler, notifier = scenario.handler, scenario.notifier
+    batches = -(-args.burst // args.batch_size)
+    print(f"  delivered {len(handler.messages)} in {elapsed * 1000:.0f} ms over {handler.connections} session(s), "
+          f"{sends} send call(s)")
+    return all([
+        check("every email delivered once", len(handler.messages) == args.burst and notifier.failed == 0),
+        check("one SMTP session for the whole burst", handler.connections == 1),
+        check(f"sent in {batches} batch(es)", sends == batches),
+        check("delivered in queue order", [s for _, _, s in handler.messages] ==
+              [f"Order #{n}" for n in range(args.burst)]),
+    ])
+
+
+async def idle(args):
+    idle_timeout = 0.5
+    print(f"idle: SMTP_IDLE_TIMEOUT={idle_timeout}s, one email, a short pause, one email, a long pause, one email")
+    async with Scenario(args, idle_timeout=idle_timeout) as scenario:
+        notifier = scenario.notifier
+        for number, pause in enumerate((idle_timeout / 5, idle_timeout * 2, 0)):
+            notifier.enqueue(make_message(number))
+            await notifier._queue.join()
+            await asyncio.sleep(pause)
+    peers = [peer for _, peer, _ in scenario.handler.messages]
+    print(f"  {len(peers)} delivered over {scenario.handler.connections} session(s)")
+    return all([
+        check("session reused within the idle timeout", len(peers) == 3 and peers[0] == peers[1]),
+        check("session reopened after the idle timeout", len(peers) == 3 and peers[2] != peers[1]),
+    ])
+
+
+async def failure(args):
+    print(f"failure: the server answers 451 to the first {args.failures} DATA command(s), "
+          f"backoff base {args.backoff}s")
+    async with Scenario(args, failures=args.failures) as scenario:
+        for number in range(3):
+            scenario.notifier.enqueue(make_message(number))
+        await scenario.notifier._queue.join()
+    handler, notifier = scenario.handler, scenario.notifier
+    # (time, peer) of every attempt at the first email: the refused ones, then the delivery
+    attempts = handler.rejected + [(t, peer) for t, peer, _ in handler.messages[:1]]
+    gaps = [later - earlier for (earlier, _), (later, _) in zip(attempts, attempts[1:])]
+    expected = [args.backoff * 2 ** n for n in range(args.failures)]
+    print("  retry delays: " + ", ".join(f"{gap:.2f}s" for gap in gaps))
+    return all([
+        check("all emails delivered after the failures", len(handler.messages) == 3 and notifier.failed == 0),
+        check(f"{args.failures} attempt(s) refused, then retried", len(handler.rejected) == args.failures),
+        check("each retry waited at least its backoff (doubling)",
+              len(gaps) == len(expected) and all(gap >= want * 0.95 for gap, want in zip(gaps, expected))),
+        check("a new session after each failure", len({peer for _, peer in attempts}) == args.failures + 1),
+    ])
+
+
+async def run(args):
+    results = []
+    for scenario in (burst, idle, failure):
+        results.append(await scenario(args))
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--burst', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--failures', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.1, help="backoff base in seconds")
+    if not asyncio.run(run(parser.parse_args())):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
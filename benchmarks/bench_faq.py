@@ -0,0 +1,81 @@
+"""
+Microbenchmark: FAQ matching cost vs. number of FAQs
+Compares the old linear substring scan with the compiled FAQMatcher and the
+fuzzy FAQIndex on synthetic FAQs (each with two aliases). The matcher's
+per-message cost should stay roughly constant as the FAQ count grows, and a
+fuzzy lookup should stay under a millisecond at thousands of entries.
+
+Usage: python benchmarks/bench_faq.py [--counts 6 100 500 2000] [--messages 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faq import FAQMatcher  # noqa: E402
+from faq_index import FAQIndex  # noqa: E402
+
+WORDS = (
+    "delivery time return policy payment method shipping cost contact working hours refund order "
+    "track parcel invoice discount coupon stock fresh organic price bulk wholesale gift wrap "
+    "cancel change address weekend holiday store location pickup express courier warranty"
+).split()
+
+
+def phrase(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)) + f" {rng.randrange(10**6)}"
+
+
+def linear_scan(faqs, message):
+    message_lower = message.lower().strip()
+    for question, answer in faqs.items():
+        if question in message_lower:
+            return answer
+    return None
+
+
+def time_per_message(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--counts', type=int, nargs='+', default=[6, 100, 500, 2000])
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'FAQs':>6} {'phrases':>8} {'linear µs':>10} {'matcher µs':>11} {'fuzzy µs':>9} {'build ms':>9}")
+    for count in args.counts:
+        faqs = {phrase(rng, 2): f"answer {i}" for i in range(count)}
+        aliases = {q: [phrase(rng, 3), phrase(rng, 2)] for q in faqs}
+        questions = list(faqs)
+        messages = [
+            f"hi, {phrase(rng, 4)} {rng.choice(questions) if rng.random() < 0.5 else ''} thanks"
+            for _ in range(args.messages)
+        ]
+        # The linear scan only knows questions; give it the aliases too for a fair comparison
+        flat = dict(faqs)
+        for question, alias_list in aliases.items():
+            for alias in alias_list:
+                flat[alias] = faqs[question]
+        matcher = FAQMatcher(faqs, aliases)
+        index = FAQIndex()
+        start = time.perf_counter()
+        index.build(faqs, aliases)
+        build_ms = (time.perf_counter() - start) * 1000
+        linear = time_per_message(lambda m: linear_scan(flat, m), messages)
+        compiled = time_per_message(matcher.match, messages)
+        fuzzy = time_per_message(index.search, messages)
+        print(f"{count:>6} {len(flat):>8} {linear:>10.1f} {compiled:>11.1f} {fuzzy:>9.1f} {build_ms:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Load test: concurrent checkouts against limited stock
+Many customers race for a few products with little stock: each reserves
+units, then checks out through the real order journal on the storage thread
+pool (commit hook included). Checks that no unit is ever sold twice, that the
+stock in memory and in the database agree afterwards, and reports how fast
+reservations and checkouts run.
+
+Usage: python benchmarks/bench_inventory.py [--customers 2000] [--stock 100] [--products 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogSnapshot, Product  # noqa: E402
+from inventory import Inventory  # noqa: E402
+from io_pool import BlockingIOPool  # noqa: E402
+from storage import OrderJournal  # noqa: E402
+
+
+async def customer(customer_id, inventory, journal, pool, skus, rng):
+    """
+    Reserve a few units, maybe abandon the cart, else check out.
+    """
+    wanted = {sku: rng.randint(1, 3) for sku in rng.sample(skus, rng.randint(1, 2))}
+    reserved = {sku: quantity for sku, quantity in wanted.items() if inventory.reserve(customer_id, sku, quantity)}
+    await asyncio.sleep(rng.random() * 0.01)  # browsing
+    if not reserved or rng.random() < 0.2:
+        inventory.release(customer_id)
+        return 0
+    if inventory.check_out(customer_id, reserved):
+        inventory.release(customer_id)
+        return 0
+    order = {'Order ID': customer_id, 'Customer ID': customer_id, 'Username': None, 'Date': '2026-01-01 12:00:00'}
+    lines = [
+        {'SKU': sku, 'Product': sku, 'Quantity': quantity, 'Price': 10.0, 'Total': 10.0 * quantity}
+        for sku, quantity in reserved.items()
+    ]
+    await pool.run(journal.commit_order, order, lines)
+    inventory.commit(customer_id)
+    return sum(reserved.values())
+
+
+async def run(args, db_path):
+    skus = [f'SKU-{i}' for i in range(args.products)]
+    snapshot = CatalogSnapshot([Product(sku, sku, 10.0, stock=args.stock) for sku in skus], version=1)
+    journal = OrderJournal(db_path)
+    inventory = Inventory(journal)
+    inventory.sync(snapshot)
+    pool = BlockingIOPool('storage', 4)
+    rng = random.Random(1)
+
+    # Hot path alone: reserve + release, no disk
+    start = time.perf_counter()
+    for i in range(100_000):
+        inventory.reserve(-1, skus[i % len(skus)], 1)
+        inventory.release(-1)
+    reserve_us = (time.perf_counter() - start) / 100_000 * 1e6
+
+    start = time.perf_counter()
+    sold = await asyncio.gather(*(
+        customer(customer_id, inventory, journal, pool, skus, rng) for customer_id in range(1, args.customers + 1)
+    ))
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    conn = journal._connect()
+    stored = dict(conn.execute("SELECT sku, on_hand FROM inventory"))
+    sold_in_db = conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_lines").fetchone()[0]
+    orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    consistent = all(stored[sku] == inventory.available(sku) and stored[sku] >= 0 for sku in skus)
+    print(f"{args.customers} customers, {args.products} products x {args.stock} units")
+    print(f"  reserve+release:   {reserve_us:.2f} us")
+    print(f"  checkouts:         {orders} orders in {elapsed:.2f}s ({orders / elapsed:.0f}/s)")
+    print(f"  units sold:        {sum(sold)} (database: {sold_in_db}, stock: {args.products * args.stock})")
+    print(f"  oversold:          {'NO' if sold_in_db <= args.products * args.stock else 'YES'}")
+    print(f"  memory == database: {'ok' if consistent and sum(sold) == sold_in_db else 'MISMATCH'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--products', type=int, default=5)
+    args = parser.parse_args()
+    # The storage pool warns about its backlog, which is the point here
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, os.path.join(tmp, 'orders.db')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: checkout write cost vs. cart size and order history
+Times OrderJournal.commit_order() (one transaction per order) against writing
+the same lines one committed insert at a time, for several cart sizes and
+history sizes. Commit time should grow with the number of lines only.
+
+Usage: python benchmarks/bench_order_commit.py [--history 0 100000] [--lines 1 10 50] [--orders 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import OrderJournal  # noqa: E402
+from bench_order_ids import preload, percentile  # noqa: E402
+
+
+def make_order(order_id, line_count):
+    order = {'Order ID': order_id, 'Customer ID': 42, 'Username': 'bench', 'Date': '2026-01-01 00:00:00'}
+    lines = [
+        {'SKU': f'SKU-{i}', 'Product': f'Product {i}', 'Quantity': 2, 'Price': 100.0, 'Total': 200.0}
+        for i in range(line_count)
+    ]
+    return order, lines
+
+
+def commit_per_line(journal, order, lines):
+    """
+    The old checkout path: every line is its own committed write.
+    """
+    for line in lines:
+        journal.commit_order(order, [line])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--history', type=int, nargs='+', default=[0, 100_000])
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--orders', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'history':>10} {'lines':>6} {'per-line ms':>12} {'batched ms':>11} {'p99 ms':>8}")
+    for history in args.history:
+        for line_count in args.lines:
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = os.path.join(tmp, 'orders.db')
+                preload(db_path, history)
+                journal = OrderJournal(db_path)
+                next_id = history + 1
+
+                start = time.perf_counter()
+                for _ in range(args.orders):
+                    # Per-line writes need distinct order IDs per line (UNIQUE order_id)
+                    order, lines = make_order(None, line_count)
+                    commit_per_line(journal, order, lines)
+                per_line_ms = (time.perf_counter() - start) * 1e3 / args.orders
+
+                samples = []
+                for _ in range(args.orders):
+                    order, lines = make_order(next_id, line_count)
+                    next_id += 1
+                    start = time.perf_counter()
+                    journal.commit_order(order, lines)
+                    samples.append((time.perf_counter() - start) * 1e3)
+                journal.close()
+                batched_ms = sum(samples) / len(samples)
+                print(f"{history:>10} {line_count:>6} {per_line_ms:>12.2f} {batched_ms:>11.2f} "
+                      f"{percentile(samples, 99):>8.2f}")
+
+    # A failing line must leave nothing behind
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = OrderJournal(os.path.join(tmp, 'orders.db'))
+        order, lines = make_order(1, 5)
+        lines[3]['Quantity'] = 'not a number'
+        try:
+            journal.commit_order(order, lines)
+        except ValueError:
+            pass
+        assert not list(journal.iter_rows()), "a failed commit left a partial order"
+        journal.close()
+        print("✅ failed commit left no partial order")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: order ID allocation latency vs. order history size
+Preloads the journal with N historical orders and times OrderIdSequence.next_id().
+Latency should stay flat as history grows. Also checks that concurrent threads
+and processes never receive duplicate IDs.
+
+Usage: python benchmarks/bench_order_ids.py [--sizes 0 10000 100000] [--allocations 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import OrderJournal, OrderIdSequence  # noqa: E402
+
+
+def preload(db_path, count):
+    """
+    Insert `count` historical single-line orders in one transaction.
+    """
+    journal = OrderJournal(db_path)
+    conn = journal._connect()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO orders (id, order_id, customer_id, username, total, date) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, i, str(i % 5000), 'bench', 107.0, '2026-01-01 00:00:00') for i in range(1, count + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO order_lines (order_ref, line_no, sku, product, quantity, price, total) "
+        "VALUES (?, 1, 'ZETA-TEA', '🫖 Zeta Tea', 1, 107.0, 107.0)",
+        ((i,) for i in range(1, count + 1)),
+    )
+    conn.execute("COMMIT")
+    journal.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def allocate_many(db_path, count):
+    sequence = OrderIdSequence(db_path)
+    ids = [sequence.next_id() for _ in range(count)]
+    sequence.close()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 10_000, 100_000])
+    parser.add_argument('--allocations', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'history':>10} {'mean µs':>10} {'p50 µs':>10} {'p99 µs':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'orders.db')
+            preload(db_path, size)
+            sequence = OrderIdSequence(db_path)
+            first = sequence.next_id()
+            assert first == size + 1, f"sequence should continue after history, got {first}"
+            samples = []
+            for _ in range(args.allocations):
+                start = time.perf_counter()
+                sequence.next_id()
+                samples.append((time.perf_counter() - start) * 1e6)
+            sequence.close()
+            mean = sum(samples) / len(samples)
+            print(f"{size:>10} {mean:>10.1f} {percentile(samples, 50):>10.1f} {percentile(samples, 99):>10.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'orders.db')
+        sequence = OrderIdSequence(db_path)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(lambda _: sequence.next_id(), range(800)))
+        assert len(set(ids)) == len(ids), "duplicate IDs handed out to threads"
+        sequence.close()
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            batches = list(pool.map(allocate_many, [db_path] * 4, [200] * 4))
+        process_ids = [i for batch in batches for i in batch]
+        assert len(set(process_ids)) == len(process_ids), "duplicate IDs handed out to processes"
+        assert not set(ids) & set(process_ids)
+        print(f"✅ {len(ids)} threaded + {len(process_ids)} multi-process allocations, no duplicates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Load test: outgoing Telegram sends through TelegramRateLimiter
+Many users get a checkout confirmation and an FAQ answer at the same time,
+sent through a real ExtBot whose HTTP layer is faked: it records when each
+message "reaches Telegram" and answers some calls with 429 Flood control
+errors. Reports the peak global and per-chat send rates (which must stay
+under the limits), how much sooner checkout replies go out than FAQ replies,
+and that every flood-limited call was retried after its retry_after.
+
+Usage: python benchmarks/bench_rate_limiter.py [--users 300] [--rate 30] [--flood-every 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import ExtBot  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+from ratelimit import TelegramRateLimiter, Priority  # noqa: E402
+from bench_order_ids import percentile  # noqa: E402
+
+
+class FakeTelegram(BaseRequest):
+    """
+    Stands in for the Bot API: every flood_every-th message gets a 429.
+    """
+
+    def __init__(self, flood_every, retry_after):
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.sent = []  # (time, chat_id, text)
+        self.floods = []  # times a 429 was returned
+        self.calls = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 5
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if endpoint == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+        self.calls += 1
+        if self.flood_every and self.calls % self.flood_every == 0:
+            self.floods.append(time.monotonic())
+            body = {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                    'parameters': {'retry_after': self.retry_after}}
+            return 429, json.dumps(body).encode()
+        self.sent.append((time.monotonic(), params['chat_id'], params['text']))
+        result = {'message_id': self.calls, 'date': 0, 'chat': {'id': int(params['chat_id']), 'type': 'private'},
+                  'text': params['text']}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+def peak_per_window(times, window):
+    """
+    Most events in any window-second interval.
+    """
+    peak, start = 0, 0
+    for end in range(len(times)):
+        while times[end] - times[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+async def run(args):
+    telegram = FakeTelegram(args.flood_every, args.retry_after)
+    limiter = TelegramRateLimiter(global_rate=args.rate, max_retries=5)
+    bot = ExtBot('1:bench', request=telegram, get_updates_request=FakeTelegram(0, 0), rate_limiter=limiter)
+    await bot.initialize()
+
+    async def send(chat_id, text, priority):
+        requested = time.monotonic()
+        await bot.send_message(chat_id, text, rate_limit_args={'priority': priority})
+        return priority, time.monotonic() - requested
+
+    start = time.monotonic()
+    # FAQ answers are requested first, so checkout only wins through priority
+    jobs = [send(chat_id, 'faq', Priority.FAQ) for chat_id in range(1, args.users + 1)]
+    jobs += [send(chat_id, 'checkout', Priority.CHECKOUT) for chat_id in range(1, args.users + 1)]
+    results = await asyncio.gather(*jobs)
+    elapsed = time.monotonic() - start
+    await bot.shutdown()
+
+    times = sorted(t for t, _, _ in telegram.sent)
+    per_chat = Counter()
+    chat_times = {}
+    for t, chat_id, _ in telegram.sent:
+        chat_times.setdefault(chat_id, []).append(t)
+    for chat_id, sent_at in chat_times.items():
+        per_chat[chat_id] = peak_per_window(sorted(sent_at), 1.0)
+    latency = {priority: sorted(d for p, d in results if p == priority) for priority in (Priority.CHECKOUT, Priority.FAQ)}
+
+    print(f"{args.users} users x 2 messages, global limit {args.rate:.0f}/s, 429 every {args.flood_every} calls")
+    print(f"  delivered:           {len(telegram.sent)} of {len(jobs)} in {elapsed:.1f}s")
+    print(f"  peak global rate:    {peak_per_window(times, 1.0)} msgs in any 1s (limit {args.rate:.0f})")
+    print(f"  peak per-chat rate:  {max(per_chat.values())} msgs in any 1s (burst {limiter.chat_burst})")
+    for priority, delays in latency.items():
+        print(f"  {priority.name.lower():<9} latency:   p50 {percentile(delays, 50):.2f}s  p99 {percentile(delays, 99):.2f}s")
+    # After a 429, nothing may reach Telegram until retry_after has passed
+    early = sum(1 for flood in telegram.floods for t in times if flood < t < flood + args.retry_after)
+    print(f"  429s returned:       {len(telegram.floods)}; sends inside a retry_after pause: {early}")
+    print(f"  limiter stats:       {limiter.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=30)
+    parser.add_argument('--flood-every', type=int, default=200)
+    parser.add_argument('--retry-after', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
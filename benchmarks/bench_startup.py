@@ -0,0 +1,144 @@
+"""
+Benchmark: cold start, from `python bot.py` to the first handled update
+Starts a fresh interpreter per run (like a dyno restart) that goes through the
+same steps as bot.main(), against a fake Telegram, and timestamps each phase:
+interpreter start, importing python-telegram-bot, importing bot.py, loading
+customers, build_application(), initialize/start, and handling the first
+/start. The FAQ index and metrics endpoint are built in the background after
+that; the time until they are ready is reported separately, as are the heavy
+libraries already imported when the first update was answered (none of NumPy,
+pandas, openpyxl or aiohttp should be).
+
+--eager imports those libraries up front, to show what they would cost.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--eager]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ('numpy', 'pandas', 'openpyxl', 'aiohttp')
+PHASES = (
+    ('interpreter', 'interpreter start'),
+    ('eager', 'eager heavy imports'),
+    ('telegram', 'import telegram.ext'),
+    ('bot_import', 'import bot'),
+    ('customers', 'load customers'),
+    ('build', 'build_application()'),
+    ('start', 'initialize + start'),
+    ('first_update', 'first update handled'),
+)
+
+
+def child(eager):
+    """
+    One cold start; prints {phase: seconds} as JSON.
+    """
+    marks = [('spawned', float(os.environ['BENCH_SPAWNED'])), ('interpreter', time.time())]
+
+    def mark(phase):
+        marks.append((phase, time.time()))
+
+    if eager:
+        for name in HEAVY_MODULES:
+            __import__(name)
+    mark('eager')
+    import telegram.ext  # noqa: F401
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from telegram import Update
+    from bench_conversation import FakeTelegram, make_update
+    mark('telegram')
+
+    import asyncio
+    import itertools
+
+    import bot
+    mark('bot_import')
+    bot.config.validate()
+    bot.customer_store.load()
+    mark('customers')
+    application = bot.build_application(request=FakeTelegram())
+    mark('build')
+
+    async def run():
+        await application.initialize()
+        await application.post_init(application)
+        await application.start()
+        mark('start')
+        update = Update.de_json(make_update(itertools.count(1), 1, '/start'), application.bot)
+        await application.process_update(update)
+        mark('first_update')
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        while bot.faq_index is None or (bot.METRICS_PORT and 'metrics_runner' not in application.bot_data):
+            await asyncio.sleep(0.005)
+        mark('background')
+        await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+        return loaded
+
+    loaded = asyncio.run(run())
+    seconds = {phase: end - start for (_, start), (phase, end) in zip(marks, marks[1:])}
+    print(json.dumps({'phases': seconds, 'loaded': loaded}))
+
+
+def cold_start(workdir, eager):
+    env = dict(
+        os.environ,
+        BENCH_SPAWNED=repr(time.time()),
+        BOT_TOKEN='1:bench',
+        OWNER_CHAT_ID='999999',
+        ORDERS_DB=os.path.join(workdir, 'orders.db'),
+        STATE_DB=os.path.join(workdir, 'orders.db'),
+        CATALOG_FILE=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'products.json'),
+        FAQ_FILE=os.path.join(workdir, 'faq.json'),
+        FAQ_INDEX_CACHE=os.path.join(workdir, 'faq_index.npz'),
+        METRICS_HOST='127.0.0.1',
+        METRICS_PORT='0',
+    )
+    command = [sys.executable, os.path.abspath(__file__), '--child'] + (['--eager'] if eager else [])
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f"cold start failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--eager', action='store_true', help="import NumPy, pandas, openpyxl and aiohttp up front")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.eager)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # The first run creates the databases; only warm-cache restarts are measured
+        cold_start(workdir, args.eager)
+        for _ in range(args.runs):
+            runs.append(cold_start(workdir, args.eager))
+
+    print(f"{args.runs} cold starts{' (eager imports)' if args.eager else ''}, median ms")
+    total = 0.0
+    for phase, label in PHASES:
+        ms = statistics.median(run['phases'][phase] for run in runs) * 1000
+        total += ms
+        print(f"  {label:<24} {ms:>8.1f}")
+    print(f"  {'time to first update':<24} {total:>8.1f}")
+    background = statistics.median(run['phases']['background'] for run in runs) * 1000
+    print(f"  {'background (FAQ index)':<24} {background:>8.1f}  after the first update")
+    loaded = sorted({name for run in runs for name in run['loaded']})
+    print(f"  heavy modules loaded before the first update: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
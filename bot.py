@@ -2,28 +2,34 @@
 Telegram Bot for Order Management with FAQ System
 Features:
 - Step-by-step order taking with conversation flow
-- Excel storage for orders
+- Order journal (SQLite) with Excel export
 - Owner notifications
 - FAQ system
 - Command handling
 """
 
+import asyncio
+import functools
 import logging
+import os
+import tempfile
+import warnings
 from datetime import datetime
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.error import BadRequest
+from telegram.warnings import PTBUserWarning
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
+    CallbackQueryHandler,
     ConversationHandler,
     ContextTypes,
     filters,
 )
-import pandas as pd
-import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import config
 from config import (
     BOT_TOKEN, 
     OWNER_CHAT_ID, 
@@ -32,8 +38,58 @@ from config import (
     SMTP_SERVER,
     SMTP_PORT,
     EMAIL_PASSWORD,
-    ORDER_NOTIFICATION_EMAIL
+    ORDER_NOTIFICATION_EMAIL,
+    ORDERS_DB,
+    EXCEL_EXPORT_INTERVAL,
+    IO_POOL_SIZE,
+    SMTP_POOL_SIZE,
+    SMTP_STARTTLS,
+    SMTP_IDLE_TIMEOUT,
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_RETRIES,
+    OWNER_DIGEST_THRESHOLD,
+    OWNER_DIGEST_INTERVAL,
+    OWNER_MESSAGES_PER_MINUTE,
+    TELEGRAM_MESSAGES_PER_SECOND,
+    CHAT_MESSAGES_PER_SECOND,
+    GROUP_MESSAGES_PER_MINUTE,
+    SEND_MAX_RETRIES,
+    BOT_MODE,
+    DROP_PENDING_UPDATES,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
+    STATE_DB,
+    PERSISTENCE_INTERVAL,
+    UPDATE_WORKERS,
+    FAQ_FILE,
+    FAQ_RELOAD_INTERVAL,
+    FAQ_INDEX_CACHE,
+    CATALOG_FILE,
+    CATALOG_RELOAD_INTERVAL,
+    CATALOG_PAGE_SIZE,
+    RESERVATION_TTL,
+    METRICS_HOST,
+    METRICS_PORT
 )
+from storage import OrderJournal, OrderIdSequence, CustomerStore
+from export import export_orders, FORMATS
+from stats import SalesStats
+from io_pool import BlockingIOPool
+from metrics import timed, counter, gauge, histogram, start_metrics_server
+from notifications import SMTPSession, EmailNotifier, OwnerNotifier, OrderNotice
+from ratelimit import TokenBucket, TelegramRateLimiter, Priority, send_priority
+from keyboards import KeyboardRegistry, CatalogPages, parse_callback, NOOP
+from catalog import Catalog
+from cart import Cart
+from bulk_order import ProductMatcher
+from inventory import Inventory
+from order_history import OrderHistory, CartLimitReached
+from persistence import SQLiteStateStore, BotPersistence
+from update_processor import PerChatUpdateProcessor
+from faq import FAQMatcher
 
 # Enable logging
 logging.basicConfig(
@@ -43,12 +99,125 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Conversation states for order flow
-NAME, PHONE, ADDRESS, PRODUCT, QUANTITY, ADD_MORE, REVIEW_CART, CONFIRM_ORDER = range(8)
+NAME, PHONE, ADDRESS, PRODUCT, QUANTITY, ADD_MORE, REVIEW_CART, CONFIRM_ORDER, SAVED_CART, CART_NAME, BULK_GUESS = range(11)
 
 # Excel file configuration
 EXCEL_FILE = "orders.xlsx"
 CUSTOMER_FILE = "customers.xlsx"
 
+# Append-only order journal (orders.xlsx is exported from it)
+order_journal = OrderJournal(ORDERS_DB)
+order_id_sequence = OrderIdSequence(ORDERS_DB)
+# Sales rollups by day/product/customer, updated in each order's transaction
+sales_stats = SalesStats(order_journal)
+# Stock levels and cart reservations; sales are counted off in each order's transaction
+inventory = Inventory(order_journal, ttl=RESERVATION_TTL)
+# Each customer's recent orders (for 🔁 Reorder Last) and saved carts
+order_history = OrderHistory(order_journal)
+# Customers indexed by Telegram user ID (customers.xlsx is imported once, then only exported)
+customer_store = CustomerStore(ORDERS_DB, legacy_excel_file=CUSTOMER_FILE)
+
+# Bounded thread pools that handlers await for blocking file/SMTP work
+io_seconds = histogram('bot_io_seconds', 'Blocking I/O job time, including queueing', ['pool', 'operation'])
+storage_pool = BlockingIOPool("storage", IO_POOL_SIZE, latency=io_seconds)
+smtp_pool = BlockingIOPool("smtp", SMTP_POOL_SIZE, latency=io_seconds)
+
+# Carts and conversation states survive restarts and can be shared by several workers
+persistence = BotPersistence(SQLiteStateStore(STATE_DB), storage_pool, update_interval=PERSISTENCE_INTERVAL)
+
+# Background email worker with one persistent, authenticated SMTP session
+email_notifier = EmailNotifier(
+    SMTPSession(
+        SMTP_SERVER,
+        SMTP_PORT,
+        username=SUPPORT_EMAIL,
+        password=EMAIL_PASSWORD,
+        starttls=SMTP_STARTTLS,
+        idle_timeout=SMTP_IDLE_TIMEOUT,
+    ),
+    smtp_pool,
+    batch_size=EMAIL_BATCH_SIZE,
+    max_retries=EMAIL_MAX_RETRIES,
+)
+
+
+def send_owner_email(notices):
+    """
+    Queue the owner email for one order, or one digest email for several.
+    """
+    if len(notices) == 1:
+        notice = notices[0]
+        send_order_email(
+            notice.order_id,
+            notice.customer,
+            str(notice.customer_id),
+            notice.html,
+            f"Telegram ID: {notice.customer_id}",
+            notice.total
+        )
+    else:
+        send_digest_email(notices)
+
+
+# All outgoing Bot API calls: global + per-chat limits, checkout before FAQ replies,
+# automatic retry after Telegram's flood-control errors
+rate_limiter = TelegramRateLimiter(
+    global_rate=TELEGRAM_MESSAGES_PER_SECOND,
+    chat_rate=CHAT_MESSAGES_PER_SECOND,
+    group_rate=GROUP_MESSAGES_PER_MINUTE / 60,
+    max_retries=SEND_MAX_RETRIES,
+)
+
+# Owner order notifications: individual messages at normal volume, digests
+# during bursts. send_message is set once the bot exists (post_init).
+owner_notifier = OwnerNotifier(
+    send_message=None,
+    send_email=send_owner_email,
+    bucket=TokenBucket(OWNER_MESSAGES_PER_MINUTE / 60, capacity=3),
+    digest_threshold=OWNER_DIGEST_THRESHOLD,
+    digest_interval=OWNER_DIGEST_INTERVAL,
+)
+
+# Metrics served on METRICS_HOST:METRICS_PORT/metrics (handler latency comes from @timed)
+STATE_NAMES = {
+    NAME: 'NAME', PHONE: 'PHONE', ADDRESS: 'ADDRESS', PRODUCT: 'PRODUCT', QUANTITY: 'QUANTITY',
+    ADD_MORE: 'ADD_MORE', REVIEW_CART: 'REVIEW_CART', CONFIRM_ORDER: 'CONFIRM_ORDER',
+    SAVED_CART: 'SAVED_CART', CART_NAME: 'CART_NAME', BULK_GUESS: 'BULK_GUESS',
+}
+orders_placed = counter('bot_orders_total', 'Checkouts by result (saved, failed)', ['result'])
+order_revenue = counter('bot_order_revenue_total', 'Total value of saved orders')
+faq_lookups = counter('bot_faq_lookups_total', 'FAQ lookups by result (exact, fuzzy, miss)', ['result'])
+bulk_items = counter(
+    'bot_bulk_items_total', 'Items typed as a list, by result (exact, words, guess, ambiguous, missing, invalid)', ['result']
+)
+update_errors = counter(
+    'bot_errors_total', 'Errors raised while handling updates, by handler and exception type', ['handler', 'type']
+)
+
+
+def conversation_counts():
+    counts = persistence.state_counts('order_conversation')
+    return {(name,): counts.get(state, 0) for state, name in STATE_NAMES.items()}
+
+
+def queue_depths():
+    return {
+        ('storage_pool',): storage_pool.queue_depth,
+        ('smtp_pool',): smtp_pool.queue_depth,
+        ('order_emails',): email_notifier.pending,
+        ('owner_notifications',): owner_notifier.pending,
+        ('telegram_sends',): rate_limiter.queue_depth,
+    }
+
+
+gauge('bot_conversations', 'Order conversations in progress, by state', ['state'], collect=conversation_counts)
+gauge('bot_queue_depth', 'Work waiting in background queues', ['queue'], collect=queue_depths)
+gauge('bot_stock_holds', 'Carts currently holding reserved stock', collect=lambda: {(): inventory.holders})
+counter(
+    'bot_telegram_flood_retries_total', 'Telegram calls retried after a flood-control error',
+    collect=lambda: {(): rate_limiter.retries},
+)
+
 # FAQ Dictionary - Add more questions and answers as needed
 FAQ_DICT = {
     "delivery time": "We typically deliver within 3-5 business days for local orders and 7-10 days for international orders.",
@@ -59,65 +228,139 @@ FAQ_DICT = {
     "working hours": "Our customer support is available Monday to Friday, 9 AM to 6 PM EST.",
 }
 
-# Grocery Items List with Prices (Indian Rupees) - Customers can select from these items
-GROCERY_ITEMS = {
-    "🧼 Bathing Soap": 35,
-    "🛁 Bathing Bar": 62,
-    "🪥 Dentassure Toothpaste": 65,
-    "🪥 Tooth Brush": 235,
-    "🫖 Zeta Tea": 107,
-    "☕ Zeta Coffee": 158,
-    "🫙 Rice Bran Cooking Oil": 295,
-    "🧴 Shampoo": 163,
-    "🧴 Hair Oil": 165,
-    "🧴 Hair Conditioner": 208,
-    "🧴 Face Wash": 146,
-    "💆 Fairness Cream": 169,
-    "🧴 Hand Wash": 118,
-    "🪒 Shaving Cream": 101,
-    "💨 Body Talc": 52,
-    "🌬️ Deo (Men or Women)": 163,
-    "🧴 Body Lotion": 191,
-    "🧼 Liquid Detergent": 321,
-    "🍽️ Dish Wash Liquid": 177,
-    "🧹 Floor Cleaner": 186,
-    "🥣 Enerva Breakfast": 299,
-    "🌿 Spirulina": 350,
-    "🫙 Flax Oil": 515,
+# Other ways customers ask the same FAQ question (matched like the question itself)
+FAQ_ALIASES = {
+    "delivery time": ["how long does delivery", "when will i get", "delivery days", "when will my order arrive"],
+    "return policy": ["refund", "return an item", "return my order", "exchange", "money back"],
+    "payment methods": ["how can i pay", "payment options", "cash on delivery", "upi", "credit card"],
+    "shipping cost": ["delivery charge", "shipping fee", "delivery fee", "free shipping"],
+    "contact": ["phone number", "email address", "customer care"],
+    "working hours": ["opening hours", "support hours", "are you open", "what time do you open"],
 }
 
+# Compiled FAQ matcher; FAQ_FILE (JSON) replaces the dictionaries above when present
+faq_matcher = FAQMatcher(FAQ_DICT, FAQ_ALIASES)
+# Fuzzy fallback for questions phrased differently. Built in the background
+# once the bot is running (see load_faq_index); until then only exact matches.
+faq_index = None
+
+# Product catalog (SKU, label, price, stock, category) loaded from CATALOG_FILE
+# in build_application and reloaded whenever the file changes
+catalog = Catalog(CATALOG_FILE)
+
+# Reply keyboards - built once on first use and shared by every handler.
+# Products are browsed with inline keyboards from a per-category page index,
+# rebuilt whenever a new catalog snapshot is loaded.
+keyboards = KeyboardRegistry()
+keyboards.register('start_menu', lambda: ReplyKeyboardMarkup(
+    [["📦 Place Order"], ["🔁 Reorder Last", "🗂 Saved Carts"], ["❓ Ask Question"]],
+    resize_keyboard=True, one_time_keyboard=True
+))
+keyboards.register('main_menu', lambda: ReplyKeyboardMarkup(
+    [["📦 Place Order"], ["🔁 Reorder Last", "🗂 Saved Carts"], ["❓ Ask Question"]], resize_keyboard=True
+))
+keyboards.register('back', lambda: ReplyKeyboardMarkup([["🔙 Back to Menu"]], resize_keyboard=True))
+keyboards.register('products', lambda: ReplyKeyboardMarkup(
+    [["🛒 View Cart", "🔙 Back to Menu"]], resize_keyboard=True
+))
+keyboards.register('catalog_pages', lambda: CatalogPages(catalog.snapshot, CATALOG_PAGE_SIZE))
+keyboards.register('add_more', lambda: ReplyKeyboardMarkup(
+    [["➕ Add More Items"], ["✅ Checkout"], ["🛒 View Cart"], ["🔙 Back to Menu"]], resize_keyboard=True
+))
+keyboards.register('empty_cart', lambda: ReplyKeyboardMarkup(
+    [["➕ Add Items"], ["🔙 Back to Menu"]], resize_keyboard=True
+))
+keyboards.register('bulk_guess', lambda: ReplyKeyboardMarkup(
+    [["✅ Add Them", "❌ Skip Them"], ["🔙 Back to Menu"]], resize_keyboard=True
+))
+keyboards.register('confirm', lambda: ReplyKeyboardMarkup(
+    [["✅ Confirm Order"], ["➕ Add More Items"], ["💾 Save Cart", "❌ Clear Cart"], ["🔙 Back to Menu"]],
+    resize_keyboard=True
+))
+# Catalog listeners run on the storage pool during reloads (see reload_catalog_job),
+# so each one swaps its state in whole; the catalog keyboard is rebuilt on the loop
+catalog.on_change(inventory.sync)
+# Typed lists ("2 shampoo, 3 zeta tea, flax oil") are matched against the current catalog
+bulk_matcher = ProductMatcher()
+catalog.on_change(bulk_matcher.compile)
+
+
+def get_cart(context):
+    """
+    The user's Cart. Carts saved as a list of items (before Cart existed) are
+    converted on first access.
+    """
+    cart = context.user_data.get('cart')
+    if not isinstance(cart, Cart):
+        cart = context.user_data['cart'] = Cart.from_items(cart or [], catalog.snapshot)
+    return cart
+
+
+def cart_info(cart):
+    """
+    One-line cart status for product screens (empty string for an empty cart).
+    """
+    if not cart:
+        return ""
+    return f"\n\n🛒 Items in cart: {cart.item_count} product(s), {cart.unit_count} units"
+
+
+def end_order(context):
+    """
+    Drop the order in progress: release its reserved stock and clear user data.
+    """
+    user_id = context.user_data.get('user_id')
+    if user_id is not None:
+        inventory.release(user_id)
+    context.user_data.clear()
+
+
+def reserve_cart(context, cart):
+    """
+    Make sure the whole cart is reserved (reservations expire and do not
+    survive restarts). Lines with too little stock left are cut down to what
+    is available, or removed. Returns a note for the customer, or "".
+    """
+    user_id = context.user_data['user_id']
+    shortages = inventory.check_out(user_id, {line.sku: line.quantity for line in cart})
+    if not shortages:
+        return ""
+    note = ""
+    for sku, available in shortages.items():
+        line = cart.set_quantity(sku, available)
+        if available:
+            note += f"⚠️ Only {available} × {line.label} left, so your cart was updated.\n\n"
+        else:
+            note += f"⚠️ {line.label} has sold out and was removed.\n\n"
+    # Cut down to what is available, so this always fits
+    inventory.check_out(user_id, {line.sku: line.quantity for line in cart})
+    return note
+
+
+def removed_note(lines):
+    """
+    Note for cart lines dropped because their product left the catalog.
+    """
+    return "".join(f"⚠️ {line.label} is no longer available and was removed.\n\n" for line in lines)
+
 
 def get_next_order_id():
     """
-    Get the next order ID by checking the existing Excel file.
-    If file doesn't exist, return 1.
+    Allocate the next order ID from the persistent order ID sequence.
+    Never reads order history and never hands out the same ID twice.
     """
-    if os.path.exists(EXCEL_FILE):
-        try:
-            df = pd.read_excel(EXCEL_FILE)
-            if len(df) > 0:
-                return df['Order ID'].max() + 1
-            else:
-                return 1
-        except Exception as e:
-            logger.error(f"Error reading Excel file: {e}")
-            return 1
-    return 1
+    return order_id_sequence.next_id()
 
 
 def get_customer_info(user_id):
     """
-    Get customer information from customer database.
+    Get customer information from the in-memory customer index.
     Returns customer data if exists, None otherwise.
     """
-    if os.path.exists(CUSTOMER_FILE):
-        try:
-            df = pd.read_excel(CUSTOMER_FILE)
-            customer = df[df['User ID'] == str(user_id)]
-            if not customer.empty:
-                return customer.iloc[0].to_dict()
-        except Exception as e:
-            logger.error(f"Error reading customer file: {e}")
+    try:
+        return customer_store.get(user_id)
+    except Exception as e:
+        logger.error(f"Error reading customer store: {e}")
     return None
 
 
@@ -126,32 +369,7 @@ def save_customer_info(user_id, name, phone, address):
     Save or update customer information in database.
     """
     try:
-        customer_data = {
-            'User ID': str(user_id),
-            'Name': name,
-            'Phone': phone,
-            'Address': address,
-            'Last Order Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        if os.path.exists(CUSTOMER_FILE):
-            df = pd.read_excel(CUSTOMER_FILE)
-            # Check if customer exists
-            if str(user_id) in df['User ID'].values:
-                # Update existing customer
-                df.loc[df['User ID'] == str(user_id), ['Name', 'Phone', 'Address', 'Last Order Date']] = [
-                    name, phone, address, customer_data['Last Order Date']
-                ]
-            else:
-                # Add new customer
-                new_customer = pd.DataFrame([customer_data])
-                df = pd.concat([df, new_customer], ignore_index=True)
-            df.to_excel(CUSTOMER_FILE, index=False)
-        else:
-            # Create new file
-            df = pd.DataFrame([customer_data])
-            df.to_excel(CUSTOMER_FILE, index=False)
-        
+        customer_store.save(user_id, name, phone, address, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         logger.info(f"Customer {user_id} info saved successfully")
         return True
     except Exception as e:
@@ -159,9 +377,9 @@ def save_customer_info(user_id, name, phone, address):
         return False
 
 
-def send_order_email(order_id, customer_name, customer_phone, products_list, address, total_price):
+def email_configured():
     """
-    Send order confirmation email to the specified email address with prices.
+    Check the email settings, logging what is missing.
     """
     if not EMAIL_PASSWORD:
         logger.warning("⚠️  Email password not configured. Skipping email notification.")
@@ -175,11 +393,18 @@ def send_order_email(order_id, customer_name, customer_phone, products_list, add
     if not ORDER_NOTIFICATION_EMAIL or "@" not in ORDER_NOTIFICATION_EMAIL:
         logger.error(f"❌ Invalid ORDER_NOTIFICATION_EMAIL: {ORDER_NOTIFICATION_EMAIL}")
         return False
+    return True
+
+
+def send_order_email(order_id, customer_name, customer_phone, products_list, address, total_price):
+    """
+    Queue order confirmation email to the specified email address with prices.
+    The email is delivered in the background by email_notifier.
+    """
+    if not email_configured():
+        return False
     
     try:
-        logger.info(f"📧 Attempting to send email from {SUPPORT_EMAIL} to {ORDER_NOTIFICATION_EMAIL}")
-        logger.info(f"📧 SMTP Server: {SMTP_SERVER}:{SMTP_PORT}")
-        
         # Create message
         msg = MIMEMultipart()
         msg['From'] = SUPPORT_EMAIL
@@ -218,71 +443,189 @@ def send_order_email(order_id, customer_name, customer_phone, products_list, add
         
         msg.attach(MIMEText(body, 'html'))
         
-        # Send email
-        logger.info("🔐 Connecting to SMTP server...")
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            logger.info("🔒 Starting TLS encryption...")
-            server.starttls()
-            logger.info(f"🔑 Logging in with email: {SUPPORT_EMAIL}")
-            server.login(SUPPORT_EMAIL, EMAIL_PASSWORD)
-            logger.info("📤 Sending email message...")
-            server.send_message(msg)
-        
-        logger.info(f"✅ Order confirmation email sent successfully for order #{order_id}")
-        logger.info(f"✅ Email sent to: {ORDER_NOTIFICATION_EMAIL}")
-        return True
-        
-    except smtplib.SMTPAuthenticationError as e:
-        logger.error(f"❌ Email authentication failed: {e}")
-        logger.error("❌ Check your EMAIL_PASSWORD or SUPPORT_EMAIL in .env file")
-        logger.error("❌ Make sure you're using a Gmail App Password, not your regular password")
-        return False
-    except smtplib.SMTPException as e:
-        logger.error(f"❌ SMTP error occurred: {e}")
+        # Hand off to the background notifier (persistent SMTP session, retries)
+        if email_notifier.enqueue(msg):
+            logger.info(f"📧 Order #{order_id} email queued for {ORDER_NOTIFICATION_EMAIL}")
+            return True
         return False
+        
     except Exception as e:
-        logger.error(f"❌ Failed to send order confirmation email: {e}")
+        logger.error(f"❌ Failed to queue order confirmation email: {e}")
         logger.error(f"❌ Exception type: {type(e).__name__}")
         return False
 
 
-def save_order_to_excel(order_data):
+def send_digest_email(notices):
     """
-    Save order data to Excel file.
-    Creates file with headers if it doesn't exist.
+    Queue one email listing several orders (sent instead of one email per
+    order during bursts).
     """
-    try:
-        # Prepare the order data
-        order_df = pd.DataFrame([order_data])
+    if not email_configured():
+        return False
+    
+    total_price = sum(notice.total for notice in notices)
+    orders_html = "".join(
+        f"<h3>📋 Order #{notice.order_id} - {notice.customer} (Telegram ID: {notice.customer_id}) - ₹{notice.total:.0f}</h3>"
+        f"<ul>{notice.html}</ul>"
+        for notice in notices
+    )
+    msg = MIMEMultipart()
+    msg['From'] = SUPPORT_EMAIL
+    msg['To'] = ORDER_NOTIFICATION_EMAIL
+    msg['Subject'] = f'{len(notices)} New Orders (#{notices[0].order_id} - #{notices[-1].order_id})'
+    body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif;">
+        <h2 style="color: #4CAF50;">🔔 {len(notices)} New Orders Received!</h2>
         
-        # Check if file exists
-        if os.path.exists(EXCEL_FILE):
-            # Append to existing file
-            existing_df = pd.read_excel(EXCEL_FILE)
-            updated_df = pd.concat([existing_df, order_df], ignore_index=True)
-            updated_df.to_excel(EXCEL_FILE, index=False)
-        else:
-            # Create new file with headers
-            order_df.to_excel(EXCEL_FILE, index=False)
+        <div style="background-color: #f5f5f5; padding: 20px; border-radius: 5px;">
+            {orders_html}
+            
+            <h3 style="color: #4CAF50;">💰 Total: ₹{total_price:.0f}</h3>
+        </div>
         
-        logger.info(f"Order {order_data['Customer ID']} saved successfully")
+        <p style="margin-top: 20px; color: #666;">
+            Orders arrived faster than usual, so they were combined into one email.
+        </p>
+    </body>
+    </html>
+    """
+    msg.attach(MIMEText(body, 'html'))
+    
+    if email_notifier.enqueue(msg):
+        logger.info(f"📧 Digest email for {len(notices)} orders queued for {ORDER_NOTIFICATION_EMAIL}")
+        return True
+    return False
+
+
+def save_order(order, lines):
+    """
+    Write an order and all of its lines to the order journal in one atomic
+    transaction. Cost depends only on the number of lines.
+    """
+    try:
+        order_journal.commit_order(order, lines)
+        logger.info(f"Order {order['Order ID']} saved successfully ({len(lines)} line(s))")
         return True
     except Exception as e:
-        logger.error(f"Error saving order to Excel: {e}")
+        logger.error(f"Error saving order to journal: {e}")
         return False
 
 
+async def export_orders_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled job: rebuild orders.xlsx from the journal without blocking the bot.
+    """
+    try:
+        await storage_pool.run(export_orders, order_journal, EXCEL_FILE)
+    except Exception as e:
+        logger.error(f"Error exporting orders to Excel: {e}")
+
+
+def is_owner(update: Update):
+    """
+    True if the update comes from the owner (OWNER_CHAT_ID is a user or chat ID).
+    """
+    owner = str(OWNER_CHAT_ID)
+    return (
+        (update.effective_user is not None and str(update.effective_user.id) == owner)
+        or (update.effective_chat is not None and str(update.effective_chat.id) == owner)
+    )
+
+
+# Telegram bots can upload documents up to 50 MB
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+
+@timed
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle /stats [days] (owner only): sales today and over the last N days
+    (default 7), with top products and customers, read from the rollups.
+    """
+    if not is_owner(update):
+        return
+    
+    try:
+        days = int(context.args[0]) if context.args else 7
+        if not 1 <= days <= 366:
+            raise ValueError
+    except ValueError:
+        await update.message.reply_text("Usage: /stats [days] (1-366)")
+        return
+    
+    try:
+        summary = await storage_pool.run(sales_stats.summary, days)
+    except Exception as e:
+        logger.error(f"Error reading sales stats: {e}")
+        await update.message.reply_text("❌ Could not read sales stats, see the bot logs.")
+        return
+    await update.message.reply_text(summary)
+
+
+@timed
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle /export (owner only): stream matching orders to a file and send it
+    as a document.
+    Usage: /export [xlsx|csv|parquet] [from=YYYY-MM-DD] [to=YYYY-MM-DD] [customer=ID]
+    """
+    if not is_owner(update):
+        return
+    
+    fmt, options = 'xlsx', {}
+    for arg in context.args:
+        key, _, value = arg.partition('=')
+        if not value and key.lower() in FORMATS:
+            fmt = key.lower()
+        elif value and key in ('from', 'to', 'customer'):
+            options[key] = value
+        else:
+            await update.message.reply_text(
+                "Usage: /export [xlsx|csv|parquet] [from=YYYY-MM-DD] [to=YYYY-MM-DD] [customer=ID]"
+            )
+            return
+    
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="orders_")
+    os.close(fd)
+    try:
+        count = await storage_pool.run(
+            export_orders,
+            order_journal,
+            path,
+            date_from=options.get('from'),
+            date_to=options.get('to'),
+            customer_id=options.get('customer'),
+        )
+        if os.path.getsize(path) > MAX_DOCUMENT_BYTES:
+            await update.message.reply_text(
+                f"⚠️ The export has {count} rows and is too large for Telegram. "
+                "Narrow it with from=/to=/customer= or run export.py on the server."
+            )
+            return
+        with open(path, 'rb') as f:
+            await update.message.reply_document(
+                document=f,
+                filename=f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+                caption=f"📤 {count} order rows",
+            )
+    except (ValueError, ImportError) as e:
+        await update.message.reply_text(f"❌ Export failed: {e}")
+    except Exception as e:
+        logger.error(f"Error exporting orders: {e}")
+        await update.message.reply_text("❌ Export failed, see the bot logs.")
+    finally:
+        os.remove(path)
+
+
+@timed
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle /start command.
     Show welcome message with options.
     """
     user = update.effective_user
-    keyboard = [
-        ["📦 Place Order"],
-        ["❓ Ask Question"],
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+    reply_markup = keyboards.get('start_menu')
     
     welcome_message = (
         f"👋 Hello {user.first_name}! Welcome to our store!\n\n"
@@ -295,12 +638,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(welcome_message, reply_markup=reply_markup)
 
 
+@timed
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle /cancel command.
     Cancel current order conversation.
     """
-    context.user_data.clear()
+    end_order(context)
     return await back_to_menu(update, context)
 
 
@@ -308,11 +652,7 @@ async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Return user to main menu.
     """
-    keyboard = [
-        ["📦 Place Order"],
-        ["❓ Ask Question"],
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('main_menu')
     
     await update.message.reply_text(
         "🏠 Back to Main Menu\n\n"
@@ -322,6 +662,7 @@ async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+@timed
 async def start_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Start ordering directly using Telegram ID.
@@ -330,31 +671,120 @@ async def start_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or f"User{user_id}"
     
-    # Initialize cart & user data
-    context.user_data['cart'] = []
+    # Initialize cart & user data (a new order gives back stock held by an old cart)
+    inventory.release(user_id)
+    context.user_data['cart'] = Cart()
     context.user_data['user_id'] = user_id
     context.user_data['username'] = username
     
     logger.info(f"📦 Order started by Telegram ID: {user_id} (@{username})")
     
     # SKIP EVERYTHING - GO DIRECTLY TO PRODUCTS!
-    keyboard = []
-    items_list = list(GROCERY_ITEMS.keys())
-    for i in range(0, len(items_list), 2):
-        row = items_list[i:i+2]
-        keyboard.append(row)
-    keyboard.append(["🛒 View Cart", "🔙 Back to Menu"])
-    
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
-    await update.message.reply_text(
+    await send_catalog(
+        update.message,
         f"👋 Welcome @{username}! (ID: {user_id})\n\n"
-        "🛒 Select items you want to order:"
+        "🛒 Select items you want to order:\n\n"
+        "📝 Or type your whole list at once, e.g. 2 shampoo, 3 zeta tea, flax oil"
     )
-    await update.message.reply_text("Our products:", reply_markup=reply_markup)
     return PRODUCT
 
 
+async def send_catalog(message, text):
+    """
+    Send text with the cart/back keyboard, then the first catalog browsing
+    screen (category menu) as an inline keyboard.
+    """
+    await message.reply_text(text, reply_markup=keyboards.get('products'))
+    screen_text, markup = keyboards.get('catalog_pages').first_screen()
+    await message.reply_text(screen_text, reply_markup=markup)
+
+
+async def ask_quantity(message, context, product):
+    """
+    Remember the selected product and ask how many to add.
+    """
+    available = inventory.available(product.sku)
+    if available == 0:
+        await message.reply_text(
+            f"😔 Sorry, {product.label} is sold out. Please select another item.",
+            reply_markup=keyboards.get('products')
+        )
+        return PRODUCT
+    context.user_data['current_sku'] = product.sku
+    stock_note = f"\n📦 Only {available} left" if available is not None else ""
+    await message.reply_text(
+        f"✅ {product.label}\n💰 Price: ₹{product.price:.0f}{stock_note}\n\n"
+        "How many?",
+        reply_markup=keyboards.get('back')
+    )
+    return QUANTITY
+
+
+async def show_screen(query, text, markup):
+    """
+    Replace an inline browsing screen in place.
+    """
+    try:
+        await query.edit_message_text(text, reply_markup=markup)
+    except BadRequest as e:
+        # Tapping the button for the screen already shown
+        if "not modified" not in str(e):
+            raise
+
+
+@timed
+async def browse_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Inline catalog browsing: category menu pages, product pages and product
+    picks. Page changes edit the message in place, so every screen costs one
+    bounded payload; picking a product asks for the quantity.
+    """
+    query = update.callback_query
+    kind, fields = parse_callback(query.data)
+    pages = keyboards.get('catalog_pages')
+    
+    if kind == 'pk':
+        product = catalog.snapshot.get(fields[0] if fields else None)
+        if product is None:
+            await query.answer("⚠️ Sorry, that item is no longer available.", show_alert=True)
+            await show_screen(query, *pages.first_screen())
+            return None
+        await query.answer()
+        return await ask_quantity(query.message, context, product)
+    
+    try:
+        version, *numbers = [int(field) for field in fields]
+    except ValueError:
+        version, numbers = None, []
+    
+    if kind in ('cm', 'cp') and version != pages.version:
+        # Button from before a catalog reload: positions may have moved
+        await query.answer("🔄 The catalog was updated.")
+        await show_screen(query, *pages.first_screen())
+    elif kind == 'cm' and len(numbers) == 1:
+        await query.answer()
+        await show_screen(query, *pages.category_menu(numbers[0]))
+    elif kind == 'cp' and len(numbers) == 2 and 0 <= numbers[0] < len(pages.categories):
+        await query.answer()
+        await show_screen(query, *pages.product_page(numbers[0], numbers[1]))
+    else:
+        # NOOP (page counter) or unknown data
+        await query.answer()
+    return None
+
+
+@timed
+async def browse_outside_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Catalog buttons tapped after the order conversation has ended.
+    """
+    query = update.callback_query
+    if query.data == NOOP:
+        await query.answer()
+        return
+    await query.answer("Tap 📦 Place Order to start a new order.", show_alert=True)
+
+
 async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     NEW CUSTOMERS ONLY: Store customer name and ask for phone number.
@@ -362,12 +792,11 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     # Check for back button
     if update.message.text == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     
     # Store name for new customer
-    keyboard = [["🔙 Back to Menu"]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('back')
     
     context.user_data['name'] = update.message.text
     await update.message.reply_text(
@@ -384,15 +813,14 @@ async def get_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     # Back to menu
     if update.message.text == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     
     # Store phone
     context.user_data['phone'] = update.message.text
     
     # Ask for address
-    keyboard = [["🔙 Back to Menu"]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('back')
     
     await update.message.reply_text(
         f"📱 Phone saved!\n\n"
@@ -409,7 +837,7 @@ async def get_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     # Back to menu
     if update.message.text == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     
     # Store address
@@ -417,7 +845,8 @@ async def get_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # 💾 SAVE CUSTOMER TO EXCEL NOW
     user_id = context.user_data['user_id']
-    save_customer_info(
+    await storage_pool.run(
+        save_customer_info,
         user_id,
         context.user_data['name'],
         context.user_data['phone'],
@@ -426,14 +855,7 @@ async def get_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"✅ NEW customer {user_id} saved to database")
     
     # Now show products
-    keyboard = []
-    items_list = list(GROCERY_ITEMS.keys())
-    for i in range(0, len(items_list), 2):
-        row = items_list[i:i+2]
-        keyboard.append(row)
-    keyboard.append(["🛒 View Cart", "🔙 Back to Menu"])
-    
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('products')
     
     await update.message.reply_text(
         "✅ All details saved!\n\n"
@@ -447,29 +869,14 @@ async def show_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Display grocery items for selection.
     """
-    # Create keyboard with grocery items (2 items per row)
-    keyboard = []
-    items_list = list(GROCERY_ITEMS.keys())
-    for i in range(0, len(items_list), 2):
-        row = items_list[i:i+2]
-        keyboard.append(row)
-    keyboard.append(["🛒 View Cart", "🔙 Back to Menu"])
-    
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
-    cart_info = ""
-    total_items = 0
-    if context.user_data.get('cart'):
-        total_items = sum([item['quantity'] for item in context.user_data['cart']])
-        cart_info = f"\n\n🛒 Items in cart: {len(context.user_data['cart'])} product(s), {total_items} units"
-    
-    await update.message.reply_text(
-        "🛒 Select products from our grocery list:{cart_info}".format(cart_info=cart_info),
-        reply_markup=reply_markup
+    await send_catalog(
+        update.message,
+        "🛒 Select products from our grocery list:{cart_info}".format(cart_info=cart_info(get_cart(context)))
     )
     return PRODUCT
 
 
+@timed
 async def get_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle product selection from the grocery list.
@@ -478,92 +885,155 @@ async def get_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Back to menu
     if selected_text == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     
     # View cart before checkout
     if selected_text == "🛒 View Cart":
         return await review_cart(update, context)
     
-    # Validate if selected product is from the list
-    if selected_text not in GROCERY_ITEMS:
+    # Products are normally picked from the inline catalog, but an exact
+    # product name typed in is accepted too (O(1) label index)
+    product = catalog.snapshot.find_label(selected_text)
+    if product is None:
+        matches = bulk_matcher.resolve(selected_text)
+        if len(matches) == 1 and matches[0].product and not matches[0].item.quantity_given:
+            # One product name without a quantity: ask for it as if it had been picked
+            match = matches[0]
+            bulk_items.labels(match.kind).inc()
+            if match.kind == 'guess':
+                await update.message.reply_text(f"🔎 Did you mean {match.product.label}? (🔙 Back to Menu if not)")
+            return await ask_quantity(update.message, context, match.product)
+        if any(match.product or match.item.problem for match in matches):
+            # A typed list goes into the cart in one step
+            return await add_bulk_items(update, context, matches)
         # Show products again if invalid selection
-        keyboard = []
-        items_list = list(GROCERY_ITEMS.keys())
-        for i in range(0, len(items_list), 2):
-            row = items_list[i:i+2]
-            keyboard.append(row)
-        keyboard.append(["🛒 View Cart", "🔙 Back to Menu"])
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        
-        await update.message.reply_text(
-            "⚠️ Please select a valid item:",
-            reply_markup=reply_markup
-        )
+        await send_catalog(update.message, "⚠️ Please select a valid item:")
         return PRODUCT
     
     # Valid product - ask for quantity
-    context.user_data['current_product'] = selected_text
-    
-    keyboard = [["🔙 Back to Menu"]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
-    price = GROCERY_ITEMS[selected_text]
-    await update.message.reply_text(
-        f"✅ {selected_text}\n💰 Price: ₹{price:.0f}\n\n"
-        "How many?",
-        reply_markup=reply_markup
-    )
-    return QUANTITY
+    return await ask_quantity(update.message, context, product)
 
 
+async def add_bulk_items(update, context, matches):
+    """
+    Add the items of a typed list that matched exactly or by whole words to
+    the cart. Typo guesses are only added once the customer confirms them
+    (BULK_GUESS); otherwise the cart is shown once for confirmation, with a
+    note on what was skipped.
+    """
+    cart = get_cart(context)
+    notes, guesses = [], []
+    for match in matches:
+        text = match.item.text
+        if match.item.problem:
+            bulk_items.labels('invalid').inc()
+            notes.append(f"❌ \"{text}\": {match.item.problem}")
+        elif match.product is None:
+            bulk_items.labels('ambiguous' if match.candidates else 'missing').inc()
+            if match.candidates:
+                notes.append(f"❓ \"{text}\" could be: {', '.join(p.label for p in match.candidates)}")
+            else:
+                notes.append(f"❓ \"{text}\" was not found")
+        elif match.kind == 'guess':
+            bulk_items.labels('guess').inc()
+            guesses.append(match)
+        else:
+            bulk_items.labels(match.kind).inc()
+            cart.add(match.product, match.item.quantity)
+    if notes:
+        await update.message.reply_text("📝 From your list:\n" + "\n".join(notes))
+    if guesses:
+        context.user_data['bulk_guesses'] = [[match.product.sku, match.item.quantity] for match in guesses]
+        await update.message.reply_text(
+            "🔎 Did you mean:\n" + "\n".join(
+                f"  • {match.item.quantity} × {match.product.label} (for \"{match.item.text}\")" for match in guesses
+            ) + "\n\nAdd them to your cart?",
+            reply_markup=keyboards.get('bulk_guess')
+        )
+        return BULK_GUESS
+    if not cart:
+        await send_catalog(update.message, "⚠️ Please select a valid item:")
+        return PRODUCT
+    # review_cart reserves the stock and cuts lines down to what is available
+    return await review_cart(update, context)
+
+
+@timed
+async def confirm_guesses(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Add (or skip) the typo guesses from a typed list, then show the cart.
+    """
+    choice = update.message.text
+    if choice == "🔙 Back to Menu":
+        end_order(context)
+        return await back_to_menu(update, context)
+    if choice not in ("✅ Add Them", "❌ Skip Them"):
+        await update.message.reply_text("Please choose ✅ Add Them or ❌ Skip Them.",
+                                        reply_markup=keyboards.get('bulk_guess'))
+        return BULK_GUESS
+    guesses = context.user_data.pop('bulk_guesses', [])
+    if choice == "✅ Add Them":
+        cart = get_cart(context)
+        for sku, quantity in guesses:
+            product = catalog.snapshot.get(sku)
+            if product is not None:
+                cart.add(product, quantity)
+    return await review_cart(update, context)
+
+
+@timed
 async def get_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Store quantity, add to cart, and ask if want more items.
     """
     # Check for back button
     if update.message.text == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     
     try:
         quantity = int(update.message.text)
         if quantity <= 0:
-            keyboard = [["🔙 Back to Menu"]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+            reply_markup = keyboards.get('back')
             await update.message.reply_text(
                 "❌ Please enter a valid positive number for quantity:",
                 reply_markup=reply_markup
             )
             return QUANTITY
         
-        # Add item to cart
-        cart_item = {
-            'product': context.user_data['current_product'],
-            'quantity': quantity
-        }
-        context.user_data['cart'].append(cart_item)
+        # Add item to cart, keyed by SKU so it survives label and price changes
+        product = catalog.snapshot.get(context.user_data.get('current_sku'))
+        if product is None:
+            await send_catalog(update.message, "⚠️ Sorry, that item is no longer available. Please select another:")
+            return PRODUCT
+        # Reserve the stock before it goes into the cart
+        if not inventory.reserve(context.user_data['user_id'], product.sku, quantity):
+            available = inventory.available(product.sku)
+            if not available:
+                await send_catalog(update.message, f"😔 Sorry, {product.label} just sold out. Please select another item:")
+                return PRODUCT
+            await update.message.reply_text(
+                f"⚠️ Only {available} × {product.label} left. How many would you like?",
+                reply_markup=keyboards.get('back')
+            )
+            return QUANTITY
+        cart = get_cart(context)
+        cart.add(product, quantity)
         
         # Ask if want more items
-        keyboard = [
-            ["➕ Add More Items"],
-            ["✅ Checkout"],
-            ["🛒 View Cart"],
-            ["🔙 Back to Menu"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        reply_markup = keyboards.get('add_more')
         
         await update.message.reply_text(
-            f"✅ Added {quantity} x {context.user_data['current_product']} to cart!\n\n"
-            f"🛒 Total items in cart: {len(context.user_data['cart'])}\n\n"
+            f"✅ Added {quantity} x {product.label} to cart!\n\n"
+            f"🛒 Total items in cart: {cart.item_count}\n\n"
             "What would you like to do next?",
             reply_markup=reply_markup
         )
         return ADD_MORE
         
     except ValueError:
-        keyboard = [["🔙 Back to Menu"]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        reply_markup = keyboards.get('back')
         await update.message.reply_text(
             "❌ Please enter a valid number for quantity:",
             reply_markup=reply_markup
@@ -571,6 +1041,7 @@ async def get_quantity(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return QUANTITY
 
 
+@timed
 async def add_more_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle add more items or checkout.
@@ -578,7 +1049,7 @@ async def add_more_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     choice = update.message.text
     
     if choice == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     elif choice == "➕ Add More Items":
         return await show_products(update, context)
@@ -590,53 +1061,49 @@ async def add_more_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ADD_MORE
 
 
-async def review_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
+@timed
+@send_priority(Priority.CHECKOUT)
+async def review_cart(update: Update, context: ContextTypes.DEFAULT_TYPE, note=""):
     """
-    Show cart contents with prices and ask for confirmation.
+    Show cart contents with prices and ask for confirmation. note (e.g. what
+    a caller already removed from the cart) is shown with the cart's own
+    removed and sold-out notes.
     """
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context)
+    dropped = cart.reprice(catalog.snapshot)
+    for line in dropped:
+        inventory.release(context.user_data['user_id'], line.sku)
+    note += removed_note(dropped) + reserve_cart(context, cart)
     
     if not cart:
-        keyboard = [
-            ["➕ Add Items"],
-            ["🔙 Back to Menu"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        # Say why the cart is empty when its items were removed or sold out
+        reply_markup = keyboards.get('empty_cart')
         await update.message.reply_text(
-            "🛒 Your cart is empty!\n\n"
+            f"{note}🛒 Your cart is empty!\n\n"
             "Would you like to add some items?",
             reply_markup=reply_markup
         )
         return ADD_MORE
     
     # Build cart summary with prices
-    cart_summary = "🛒 YOUR CART:\n\n"
-    total_price = 0
-    for idx, item in enumerate(cart, 1):
-        price = GROCERY_ITEMS.get(item['product'], 0)
-        item_total = price * item['quantity']
-        total_price += item_total
-        cart_summary += f"{idx}. {item['product']}\n   Qty: {item['quantity']} × ₹{price:.0f} = ₹{item_total:.0f}\n\n"
-    
-    cart_summary += f"💰 TOTAL: ₹{total_price:.0f}\n\n"
-    cart_summary += f"📦 Total Items: {len(cart)}\n"
+    cart_summary = "🛒 YOUR CART:\n\n" + cart.render().review
+    cart_summary += note
+    
+    cart_summary += f"💰 TOTAL: ₹{cart.total:.0f}\n\n"
+    cart_summary += f"📦 Total Items: {cart.item_count}\n"
     cart_summary += f"🆔 Order By: @{context.user_data.get('username', 'User')} (ID: {context.user_data['user_id']})\n\n"
     cart_summary += "Confirm your order?"
     
-    context.user_data['total_price'] = total_price
+    context.user_data['total_price'] = cart.total
     
-    keyboard = [
-        ["✅ Confirm Order"],
-        ["➕ Add More Items"],
-        ["❌ Clear Cart"],
-        ["🔙 Back to Menu"]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('confirm')
     
     await update.message.reply_text(cart_summary, reply_markup=reply_markup)
     return CONFIRM_ORDER
 
 
+@timed
+@send_priority(Priority.CHECKOUT)
 async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle order confirmation, cancellation, or cart modification.
@@ -644,37 +1111,21 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     choice = update.message.text
     
     if choice == "🔙 Back to Menu":
-        context.user_data.clear()
+        end_order(context)
         return await back_to_menu(update, context)
     elif choice == "➕ Add More Items":
-        # Create keyboard with grocery items (2 items per row)
-        keyboard = []
-        items_list = list(GROCERY_ITEMS.keys())
-        for i in range(0, len(items_list), 2):
-            row = items_list[i:i+2]
-            keyboard.append(row)
-        keyboard.append(["🛒 View Cart", "🔙 Back to Menu"])
-        
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        
-        cart_info = ""
-        total_items = 0
-        if context.user_data.get('cart'):
-            total_items = sum([item['quantity'] for item in context.user_data['cart']])
-            cart_info = f"\n\n🛒 Items in cart: {len(context.user_data['cart'])} product(s), {total_items} units"
-        
+        await send_catalog(update.message, f"➕ Add More Items...{cart_info(get_cart(context))}")
+        return PRODUCT
+    elif choice == "💾 Save Cart":
         await update.message.reply_text(
-            f"➕ Add More Items...{cart_info}",
-            reply_markup=reply_markup
+            "💾 Name this cart (e.g. Weekly groceries), so you can order it again from 🗂 Saved Carts:",
+            reply_markup=keyboards.get('back')
         )
-        return PRODUCT
+        return CART_NAME
     elif choice == "❌ Clear Cart":
-        context.user_data['cart'] = []
-        keyboard = [
-            ["➕ Add Items"],
-            ["🔙 Back to Menu"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        get_cart(context).clear()
+        inventory.release(context.user_data['user_id'])
+        reply_markup = keyboards.get('empty_cart')
         await update.message.reply_text(
             "🗑️ Cart cleared!\n\n"
             "Would you like to add some items?",
@@ -683,50 +1134,57 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ADD_MORE
     elif choice == "✅ Confirm Order":
         # Process the order
-        cart = context.user_data['cart']
-        order_id = get_next_order_id()
+        cart = get_cart(context)
+        user_id = context.user_data['user_id']
         
-        # Prepare order data for each item (only save products with prices)
-        all_orders_saved = True
-        for item in cart:
-            # Skip products without prices
-            if item['product'] not in GROCERY_ITEMS:
-                logger.warning(f"⚠️ Skipping product '{item['product']}' - not in price list")
-                continue
-            
-            order_data = {
-                'Customer ID': context.user_data['user_id'],
-                'Username': context.user_data.get('username', 'Unknown'),
-                'Product': item['product'],
-                'Quantity': item['quantity'],
-                'Price': GROCERY_ITEMS[item['product']],
-                'Total': GROCERY_ITEMS[item['product']] * item['quantity'],
-                'Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Price every line from the current catalog, skipping products no longer sold
+        dropped = cart.reprice(catalog.snapshot)
+        for line in dropped:
+            logger.warning(f"⚠️ Skipping product '{line.sku}' - not in catalog")
+            inventory.release(user_id, line.sku)
+        
+        # Hold stock for every line; if some sold out meanwhile, show the updated cart again
+        stock_note = reserve_cart(context, cart)
+        if not cart:
+            # Everything was removed or sold out: never save an order without lines
+            return await review_cart(update, context, note=removed_note(dropped) + stock_note)
+        if stock_note:
+            await update.message.reply_text(stock_note + "Please check your cart before confirming.")
+            return await review_cart(update, context)
+        
+        order_id = await storage_pool.run(get_next_order_id)
+        view = cart.render()
+        total_price = cart.total
+        
+        # Save the order header and all lines in one transaction
+        order = {
+            'Order ID': order_id,
+            'Customer ID': context.user_data['user_id'],
+            'Username': context.user_data.get('username', 'Unknown'),
+            'Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        order_lines = [
+            {
+                'SKU': line.sku,
+                'Product': line.label,
+                'Quantity': line.quantity,
+                'Price': line.price,
+                'Total': line_total,
             }
-            
-            if not save_order_to_excel(order_data):
-                all_orders_saved = False
-                break
+            for line, line_total in view.lines
+        ]
         
-        if all_orders_saved:
+        if await storage_pool.run(save_order, order, order_lines):
+            inventory.commit(user_id)
+            orders_placed.labels('saved').inc()
+            order_revenue.inc(total_price)
+            
             # Build order confirmation message with prices
-            # Only include products that have prices
-            total_price = 0
-            products_list = ""
-            for item in cart:
-                price = GROCERY_ITEMS.get(item['product'], None)
-                # Skip products without prices
-                if price is None:
-                    logger.warning(f"⚠️ Product '{item['product']}' has no price, skipping from order")
-                    continue
-                
-                item_total = price * item['quantity']
-                total_price += item_total
-                products_list += f"  • {item['product']}\n    ₹{price:.0f} × {item['quantity']} = ₹{item_total:.0f}\n"
+            products_list = view.summary
             
             confirmation_msg = (
                 f"✅ ORDER CONFIRMED!\n\n"
-                f"🆔 Order ID: {context.user_data['user_id']}\n"
+                f"🆔 Order ID: {order_id}\n"
                 f"📦 Products:\n{products_list}\n"
                 f"💰 TOTAL: ₹{total_price:.0f}\n"
                 f"📅 Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
@@ -734,75 +1192,225 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             
             # Send confirmation to customer
-            keyboard = [["📦 Place Order"], ["❓ Ask Question"]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+            reply_markup = keyboards.get('main_menu')
             await update.message.reply_text(confirmation_msg, reply_markup=reply_markup)
             
-            # Notify owner
+            # Notify owner (Telegram + email), coalesced into digests during bursts
+            username = context.user_data.get('username', 'User')
             owner_message = (
                 f"🔔 NEW ORDER RECEIVED!\n\n"
-                f"🆔 Order ID: {context.user_data['user_id']}\n"
-                f"👤 Customer: @{context.user_data.get('username', 'User')}\n"
+                f"🆔 Order ID: {order_id}\n"
+                f"👤 Customer: @{username}\n"
                 f"📦 Products:\n{products_list}\n"
                 f"💰 TOTAL: ₹{total_price:.0f}\n"
                 f"📅 Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             )
-            
-            try:
-                await context.bot.send_message(chat_id=OWNER_CHAT_ID, text=owner_message)
-                logger.info(f"Owner notified about order {context.user_data['user_id']}")
-            except Exception as e:
-                logger.error(f"Failed to notify owner: {e}")
-            
-            # Send email notification with prices (only products with prices)
-            products_html = ""
-            for item in cart:
-                price = GROCERY_ITEMS.get(item['product'], None)
-                # Skip products without prices
-                if price is None:
-                    continue
-                
-                item_total = price * item['quantity']
-                products_html += f"<li>{item['product']} (₹{price:.0f} × {item['quantity']}) = ₹{item_total:.0f}</li>"
-            
-            send_order_email(
-                context.user_data['user_id'],
-                context.user_data.get('username', 'User'),
-                str(context.user_data['user_id']),
-                products_html,
-                f"Telegram ID: {context.user_data['user_id']}",
-                total_price
-            )
+            items = ", ".join(f"{line.label} ×{line.quantity}" for line, _ in view.lines)
+            owner_notifier.notify(OrderNotice(
+                order_id=order_id,
+                customer=username,
+                customer_id=context.user_data['user_id'],
+                total=total_price,
+                text=owner_message,
+                line=f"🆔 {order_id} · @{username} · ₹{total_price:.0f}\n   {items}",
+                html=view.html,
+            ))
         else:
-            keyboard = [["📦 Place Order"], ["❓ Ask Question"]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+            orders_placed.labels('failed').inc()
+            # The stored stock may be lower than ours (e.g. sold by another bot process)
+            await storage_pool.run(inventory.refresh)
+            reply_markup = keyboards.get('main_menu')
             await update.message.reply_text(
                 "❌ Sorry, there was an error processing your order. Please try again or contact support.",
                 reply_markup=reply_markup
             )
         
         # Clear user data
-        context.user_data.clear()
+        end_order(context)
         return ConversationHandler.END
     else:
         return CONFIRM_ORDER
 
 
-def check_faq(message_text):
+# Longest saved cart name (it becomes a keyboard button)
+MAX_CART_NAME = 32
+
+
+async def start_cart_from(update, context, items, title):
+    """
+    Start an order from stored items (a past order or a saved cart): rebuild
+    the cart from the current catalog, so prices are today's and products no
+    longer sold are left out, then go straight to the review screen.
+    """
+    user_id = update.effective_user.id
+    username = update.effective_user.username or f"User{user_id}"
+    inventory.release(user_id)
+    missing = []
+    context.user_data['cart'] = Cart.from_items(items, catalog.snapshot, missing)
+    context.user_data['user_id'] = user_id
+    context.user_data['username'] = username
+    
+    note = "".join(f"⚠️ {item['product']} is no longer available.\n" for item in missing)
+    if not context.user_data['cart']:
+        await send_catalog(update.message, f"{title}\n\n{note}🛒 Please select items to order:")
+        return PRODUCT
+    await update.message.reply_text(f"{title}\n\n{note}" if note else title)
+    return await review_cart(update, context)
+
+
+@timed
+@send_priority(Priority.CHECKOUT)
+async def reorder_last(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    🔁 Reorder Last: put the customer's last order in the cart again.
+    """
+    last = await storage_pool.run(order_history.last_order, update.effective_user.id)
+    if last is None:
+        await update.message.reply_text(
+            "🔁 You have no previous orders yet. Tap 📦 Place Order to start one!",
+            reply_markup=keyboards.get('main_menu')
+        )
+        return ConversationHandler.END
+    logger.info(f"🔁 Reorder of order {last.order_id} by {update.effective_user.id}")
+    return await start_cart_from(update, context, last.items, f"🔁 Your last order (#{last.order_id}, {last.date[:10]}):")
+
+
+@timed
+async def show_saved_carts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    🗂 Saved Carts: list the customer's saved carts as buttons.
+    """
+    names = await storage_pool.run(order_history.saved_cart_names, update.effective_user.id)
+    if not names:
+        await update.message.reply_text(
+            "🗂 You have no saved carts yet.\n\n"
+            "While reviewing a cart, tap 💾 Save Cart to keep it for next time.",
+            reply_markup=keyboards.get('main_menu')
+        )
+        return ConversationHandler.END
+    buttons = [[f"🗂 {name}"] for name in names] + [["🔙 Back to Menu"]]
+    await update.message.reply_text(
+        "🗂 Your saved carts - which one would you like to order?",
+        reply_markup=ReplyKeyboardMarkup(buttons, resize_keyboard=True)
+    )
+    return SAVED_CART
+
+
+@timed
+@send_priority(Priority.CHECKOUT)
+async def pick_saved_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Check if the message matches any FAQ question.
-    Returns the answer if found, None otherwise.
+    Put the picked saved cart in the cart.
     """
-    message_lower = message_text.lower().strip()
+    if update.message.text == "🔙 Back to Menu":
+        end_order(context)
+        return await back_to_menu(update, context)
     
-    # Check for exact or partial matches
-    for question, answer in FAQ_DICT.items():
-        if question in message_lower:
-            return answer
+    name = update.message.text
+    if name.startswith("🗂 "):
+        name = name[len("🗂 "):]
+    items = await storage_pool.run(order_history.saved_cart, update.effective_user.id, name)
+    if items is None:
+        await update.message.reply_text("⚠️ Please pick one of your saved carts:")
+        return SAVED_CART
+    return await start_cart_from(update, context, items, f"🗂 {name}:")
+
+
+@timed
+async def get_cart_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Save the cart under the name typed in, then show the review screen again.
+    """
+    name = update.message.text.strip()
+    if name == "🔙 Back to Menu":
+        return await review_cart(update, context)
+    if not name or len(name) > MAX_CART_NAME:
+        await update.message.reply_text(f"❌ Please use a name of up to {MAX_CART_NAME} characters:")
+        return CART_NAME
     
-    return None
+    try:
+        await storage_pool.run(
+            order_history.save_cart, context.user_data['user_id'], name, get_cart(context).to_items()
+        )
+    except CartLimitReached:
+        await update.message.reply_text(
+            f"⚠️ You already have {order_history.max_saved_carts} saved carts. "
+            "Use the name of one of them to replace it:"
+        )
+        return CART_NAME
+    await update.message.reply_text(f"💾 Saved as \"{name}\". Find it under 🗂 Saved Carts.")
+    return await review_cart(update, context)
+
+
+def check_faq(message_text):
+    """
+    Check if the message matches any FAQ question or alias, falling back to
+    the closest FAQ by similarity. Returns the answer if found, None otherwise.
+    """
+    answer = faq_matcher.match(message_text)
+    if answer is not None:
+        faq_lookups.labels('exact').inc()
+        return answer
+    answer, similarity = faq_index.search(message_text) if faq_index is not None else (None, 0.0)
+    if answer:
+        faq_lookups.labels('fuzzy').inc()
+        logger.info(f"🔎 Fuzzy FAQ match ({similarity:.2f}) for: {message_text!r}")
+    else:
+        faq_lookups.labels('miss').inc()
+    return answer
+
+
+def load_faq_index(faqs, aliases):
+    """
+    Build the fuzzy FAQ index (or load it from FAQ_INDEX_CACHE). Imports NumPy
+    on first use, so it runs on the storage pool instead of at startup.
+    """
+    from faq_index import FAQIndex
+
+    index = FAQIndex()
+    index.load_or_build(faqs, aliases, FAQ_INDEX_CACHE)
+    return index
+
+
+async def build_faq_index_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    One-off job right after startup: build the fuzzy FAQ index off the event loop.
+    """
+    global faq_index
+    # Swapped in whole, so lookups never see a half-built index
+    faq_index = await storage_pool.run(load_faq_index, faq_matcher.faqs, faq_matcher.aliases)
+
+
+async def reload_faq_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled job: hot-reload FAQs (and rebuild the fuzzy index) when FAQ_FILE changes.
+    """
+    if faq_matcher.reload_if_changed(FAQ_FILE):
+        await build_faq_index_job(context)
+
+
+async def expire_reservations_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled job: give back stock held by carts idle longer than RESERVATION_TTL.
+    """
+    inventory.expire()
+
+
+async def reload_catalog_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled job: swap in a new catalog snapshot when CATALOG_FILE changes.
+    Reading the file and the listeners (inventory.sync writes to SQLite) run
+    on the storage pool, so a checkout holding the write lock never stalls
+    other chats.
+    """
+    if await storage_pool.run(catalog.reload_if_changed):
+        # Invalidated here on the loop, so a keyboard being built from the
+        # old snapshot cannot be cached after the swap
+        keyboards.invalidate('catalog_pages')
 
 
+@timed
+@send_priority(Priority.FAQ)
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle regular messages (non-command, non-conversation).
@@ -814,8 +1422,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if message_text == "📦 Place Order":
         return await start_order(update, context)
     elif message_text == "❓ Ask Question":
-        keyboard = [["🔙 Back to Menu"]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        reply_markup = keyboards.get('back')
         await update.message.reply_text(
             "❓ Sure! What would you like to know?\n\n"
             "You can ask about:\n"
@@ -834,8 +1441,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Check FAQ
     answer = check_faq(message_text)
     
-    keyboard = [["🔙 Back to Menu"]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('back')
     
     if answer:
         await update.message.reply_text(f"💡 {answer}", reply_markup=reply_markup)
@@ -847,13 +1453,13 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+@timed
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handle /help command.
     Show available commands and features.
     """
-    keyboard = [["🔙 Back to Menu"]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    reply_markup = keyboards.get('back')
     
     help_text = (
         "🤖 Bot Commands:\n\n"
@@ -862,6 +1468,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/help - Show this help message\n\n"
         "Features:\n"
         "• Place orders from grocery list\n"
+        "• 🔁 Reorder your last order or a 💾 saved cart in one tap\n"
+        "• 📝 Type a whole list when ordering, e.g. 2 shampoo, 3 zeta tea\n"
         "• Get answers to common questions\n"
         "• Receive order confirmations\n\n"
         f"Need help? Contact {SUPPORT_EMAIL} or call {CONTACT_NUMBER}"
@@ -869,17 +1477,93 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(help_text, reply_markup=reply_markup)
 
 
-def main():
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """
-    Main function to start the bot.
+    Log errors raised while handling updates and count them by handler
+    (as tagged by @timed; "other" for untimed handlers and jobs) and type.
+    """
+    update_errors.labels(getattr(context.error, 'handler', 'other'), type(context.error).__name__).inc()
+    logger.error(f"❌ Error while handling an update: {context.error}", exc_info=context.error)
+
+
+async def start_background_workers(application: Application):
+    """
+    Application startup hook: start the email and owner notification workers.
+    """
+    await email_notifier.start()
+    owner_notifier.send_message = functools.partial(
+        application.bot.send_message, OWNER_CHAT_ID, rate_limit_args={'priority': Priority.BACKGROUND}
+    )
+    await owner_notifier.start()
+
+
+async def start_metrics_job(context: ContextTypes.DEFAULT_TYPE):
     """
-    # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    One-off job right after startup: serve /metrics (imports aiohttp, so it
+    stays off the path to the first update).
+    """
+    context.bot_data['metrics_runner'] = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+
+async def stop_owner_notifier(application: Application):
+    """
+    Application stop hook: deliver pending owner notifications while the bot
+    can still send messages.
+    """
+    await owner_notifier.stop()
+    logger.info(
+        f"Owner notifications: {owner_notifier.sent_individually} individual, "
+        f"{owner_notifier.sent_in_digests} in {owner_notifier.digests_sent} digest(s)"
+    )
+
+
+async def shutdown_io_pools(application: Application):
+    """
+    Application shutdown hook: flush queued emails and file/SMTP jobs, then stop the
+    pools and the metrics endpoint.
+    """
+    await email_notifier.stop()
+    logger.info(f"Telegram send stats: {rate_limiter.stats()}")
+    for pool in (storage_pool, smtp_pool):
+        logger.info(f"I/O pool stats: {pool.stats()}")
+        pool.shutdown(wait=True)
+    metrics_runner = application.bot_data.pop('metrics_runner', None)
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+
+
+def build_application(request=None):
+    """
+    Create the Application and register all handlers and jobs.
+    request: optional telegram.request.BaseRequest used for every Bot API call
+    instead of HTTP (the load benchmark passes a fake Telegram).
+    """
+    builder = Application.builder()
+    if request is not None:
+        builder.request(request).get_updates_request(request)
+    application = (
+        builder
+        .token(BOT_TOKEN)
+        .persistence(persistence)
+        # Different chats are handled concurrently; each chat's updates stay in order
+        .concurrent_updates(PerChatUpdateProcessor(UPDATE_WORKERS))
+        .rate_limiter(rate_limiter)
+        .post_init(start_background_workers)
+        .post_stop(stop_owner_notifier)
+        .post_shutdown(shutdown_io_pools)
+        .build()
+    )
+    
+    # Catalog buttons belong to the chat's conversation, not to one message,
+    # so the per_message=False notice for CallbackQueryHandler does not apply
+    warnings.filterwarnings("ignore", message=".*CallbackQueryHandler", category=PTBUserWarning)
     
     # Create conversation handler for order flow
     order_conv_handler = ConversationHandler(
         entry_points=[
             MessageHandler(filters.Regex("^📦 Place Order$"), start_order),
+            MessageHandler(filters.Regex("^🔁 Reorder Last$"), reorder_last),
+            MessageHandler(filters.Regex("^🗂 Saved Carts$"), show_saved_carts),
         ],
         states={
             PRODUCT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_product)],
@@ -887,20 +1571,80 @@ def main():
             ADD_MORE: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_more_handler)],
             REVIEW_CART: [MessageHandler(filters.TEXT & ~filters.COMMAND, review_cart)],
             CONFIRM_ORDER: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_order)],
+            SAVED_CART: [MessageHandler(filters.TEXT & ~filters.COMMAND, pick_saved_cart)],
+            CART_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_cart_name)],
+            BULK_GUESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_guesses)],
         },
-        fallbacks=[CommandHandler("cancel", cancel)],
+        # Inline catalog buttons stay usable from any step of the order
+        fallbacks=[CommandHandler("cancel", cancel), CallbackQueryHandler(browse_catalog)],
+        name="order_conversation",
+        persistent=True,
     )
     
     # Add handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("cancel", cancel))
+    application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(order_conv_handler)
+    application.add_handler(CallbackQueryHandler(browse_outside_order))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_error_handler(error_handler)
+    
+    # Periodically rebuild orders.xlsx from the journal (export only, never the write path)
+    if EXCEL_EXPORT_INTERVAL > 0:
+        application.job_queue.run_repeating(export_orders_job, interval=EXCEL_EXPORT_INTERVAL, first=EXCEL_EXPORT_INTERVAL)
+    
+    # Product catalog: load now (a missing or invalid file stops startup), then hot-reload
+    catalog.load()
+    if CATALOG_RELOAD_INTERVAL > 0:
+        application.job_queue.run_repeating(reload_catalog_job, interval=CATALOG_RELOAD_INTERVAL, first=CATALOG_RELOAD_INTERVAL)
+    
+    # Stock reservations of abandoned carts expire
+    application.job_queue.run_repeating(expire_reservations_job, interval=60, first=60)
+    
+    # Hot-reload FAQs from FAQ_FILE (if it exists) without a restart
+    faq_matcher.reload_if_changed(FAQ_FILE)
+    # The fuzzy index (NumPy) is built once updates are already being handled
+    application.job_queue.run_once(build_faq_index_job, when=0)
+    
+    if METRICS_PORT:
+        application.job_queue.run_once(start_metrics_job, when=0)
+    if FAQ_RELOAD_INTERVAL > 0:
+        application.job_queue.run_repeating(reload_faq_job, interval=FAQ_RELOAD_INTERVAL, first=FAQ_RELOAD_INTERVAL)
+    
+    return application
+
+
+def main():
+    """
+    Main function to start the bot.
+    """
+    config.validate()
+    
+    # Load the customer index once, before any update is handled
+    customer_store.load()
+    
+    application = build_application()
     
     # Start the bot
-    logger.info("Bot is starting...")
-    application.run_polling(drop_pending_updates=True)
+    if BOT_MODE == "webhook":
+        # aiohttp is only needed for the webhook server
+        from webhook import run_webhook
+        
+        logger.info("Bot is starting (webhook mode)...")
+        asyncio.run(run_webhook(
+            application,
+            WEBHOOK_HOST,
+            WEBHOOK_PORT,
+            WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            webhook_url=WEBHOOK_URL,
+        ))
+    else:
+        logger.info("Bot is starting...")
+        application.run_polling(drop_pending_updates=DROP_PENDING_UPDATES)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,173 @@
+"""
+Bulk cart entry for the Telegram Order Bot
+Turns one message like "2 shampoo, 3 zeta tea, flax oil" into cart lines, so
+a whole order needs one message instead of a product and a quantity message
+per item.
+
+The message is split into items on new lines, commas and semicolons; each
+item may carry a quantity before or after the name ("2 shampoo", "2x shampoo",
+"shampoo x2", "shampoo - 2"), else 1. Weights and volumes ("3 kg rice"),
+several numbers ("2 3 shampoo") and quantities above MAX_QUANTITY are rejected
+while parsing rather than guessed at. Names are matched against the catalog
+labels (and SKUs) with emojis and punctuation stripped: first exactly, then
+by whole words ("coffee" is Zeta Coffee, "oil" could be several products),
+then by trigram similarity for typos ("shampo"). Only the first two are safe
+to add without asking; trigram matches are guesses for the customer to
+confirm. The lookup tables are compiled once per catalog snapshot.
+"""
+
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Largest quantity accepted for one item
+MAX_QUANTITY = 999
+
+_ITEM_SEPARATORS = re.compile(r"[\n,;]+")
+_LEADING_QUANTITY = re.compile(r"^(\d+)\s*(?:x|×|\*|pcs?\b|nos?\b)?\s*(.*)$", re.IGNORECASE)
+_TRAILING_QUANTITY = re.compile(r"^(.*?)\s*(?:[-:=]|x|×|\*)?\s*(\d+)\s*(?:pcs?|nos?)?$", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w]+")
+# Weight and volume units, alone or glued to a number ("kg", "500g")
+_UNIT_WORD = re.compile(
+    r"^\d*(?:kgs?|kilos?|g|gms?|grams?|l|ltrs?|lit(?:re|er)s?|ml|lbs?|oz)$"
+)
+
+# quantity_given is False when the item had no number (quantity 1 is assumed);
+# problem explains why the item cannot be ordered as typed, else None
+BulkItem = namedtuple('BulkItem', ['text', 'name', 'quantity', 'quantity_given', 'problem'])
+# kind is how the product was found: 'exact', 'words' or 'guess' (trigrams);
+# product is None when nothing matched, and candidates then lists the
+# products an ambiguous name could mean
+BulkMatch = namedtuple('BulkMatch', ['item', 'product', 'kind', 'candidates'])
+
+
+def normalize(text):
+    """
+    Lowercase words without emojis or punctuation, e.g. "🫖 Zeta-Tea" -> "zeta tea".
+    """
+    return ' '.join(_NON_WORD.sub(' ', text.lower()).replace('_', ' ').split())
+
+
+def trigrams(name):
+    """
+    Character trigrams of each word, padded with spaces.
+    """
+    grams = set()
+    for word in name.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def parse_items(text):
+    """
+    Split a message into BulkItems. Items with a unit, more than one number or
+    a quantity outside 1..MAX_QUANTITY get a problem and are not matched.
+    """
+    items = []
+    for chunk in _ITEM_SEPARATORS.split(text):
+        chunk = chunk.strip(' \t-•*.')
+        if not chunk:
+            continue
+        match = _LEADING_QUANTITY.match(chunk)
+        if match and match.group(2):
+            quantity, name, given = int(match.group(1)), match.group(2), True
+        else:
+            match = _TRAILING_QUANTITY.match(chunk)
+            if match and match.group(1):
+                name, quantity, given = match.group(1), int(match.group(2)), True
+            else:
+                name, quantity, given = chunk, 1, False
+        name = normalize(name)
+        words = name.split()
+        if any(_UNIT_WORD.match(word) for word in words):
+            problem = "please give the number of packs, not a weight or volume"
+        elif not words or any(word.isdigit() for word in words):
+            problem = "please give one quantity and a product name"
+        elif not 0 < quantity <= MAX_QUANTITY:
+            problem = f"please use a quantity from 1 to {MAX_QUANTITY}"
+        else:
+            problem = None
+        items.append(BulkItem(chunk, name, quantity, given, problem))
+    return items
+
+
+class ProductMatcher:
+    """
+    Resolves free-text product names against one catalog snapshot. Register
+    compile() as a catalog listener to keep it current.
+    """
+
+    def __init__(self, min_similarity=0.45, margin=0.1):
+        self.min_similarity = min_similarity
+        # A fuzzy match must beat the runner-up by this much, else it is ambiguous
+        self.margin = margin
+        self._index = ({}, {}, [], {})
+
+    def compile(self, snapshot):
+        """
+        Build the name -> product table and the trigram index for snapshot.
+        """
+        exact, words, entries, postings = {}, {}, [], {}
+        for product in snapshot.products:
+            for name in {normalize(product.label), normalize(product.sku)}:
+                if not name:
+                    continue
+                exact.setdefault(name, product)
+                for word in name.split():
+                    words.setdefault(word, {})[product] = None  # insertion-ordered set
+                grams = trigrams(name)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(len(entries))
+                entries.append((product, len(grams)))
+        # Swapped in whole: lookups never see a half-built index
+        self._index = (exact, words, entries, postings)
+        logger.info(f"📝 Bulk order matcher compiled: {len(entries)} names")
+
+    def match(self, name):
+        """
+        (product or None, kind, candidates) for a normalized name.
+        """
+        exact, words, entries, postings = self._index
+        product = exact.get(name)
+        if product is not None:
+            return product, 'exact', []
+        # Products whose names contain every word typed
+        containing = None
+        for word in name.split():
+            products = words.get(word, {})
+            containing = [p for p in containing if p in products] if containing is not None else list(products)
+        if containing:
+            return (containing[0], 'words', []) if len(containing) == 1 else (None, 'words', containing)
+        grams = trigrams(name)
+        shared = {}
+        for gram in grams:
+            for entry in postings.get(gram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+        # Dice coefficient per product (best of its label and SKU)
+        scores = {}
+        for entry, count in shared.items():
+            product, size = entries[entry]
+            score = 2 * count / (len(grams) + size)
+            if score > scores.get(product, 0.0):
+                scores[product] = score
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+        if not ranked or ranked[0][1] < self.min_similarity:
+            return None, None, []
+        best, score = ranked[0]
+        close = [product for product, other in ranked[1:] if score - other < self.margin]
+        if close:
+            return None, 'guess', [best] + close
+        return best, 'guess', []
+
+    def resolve(self, text):
+        """
+        Parse a message and match every item: [BulkMatch], in message order.
+        Items with a problem are not matched.
+        """
+        return [
+            BulkMatch(item, None, None, []) if item.problem else BulkMatch(item, *self.match(item.name))
+            for item in parse_items(text)
+        ]
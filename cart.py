@@ -0,0 +1,180 @@
+"""
+Shopping cart for the Telegram Order Bot
+A Cart holds one line per SKU (adding a product again merges the quantities)
+and keeps the product count, unit count and total up to date on every change,
+so showing them never walks the cart. Lines are priced from the catalog
+snapshot they were last checked against; reprice() brings them up to date
+after a catalog reload. render() builds every text/HTML/order-row format in one
+pass over the lines.
+"""
+
+from collections import namedtuple
+
+# Everything the handlers show or store for a cart, built by Cart.render()
+CartView = namedtuple('CartView', ['review', 'summary', 'html', 'lines'])
+
+
+class CartLine:
+    """
+    One product in the cart.
+    """
+
+    __slots__ = ('sku', 'label', 'price', 'quantity')
+
+    def __init__(self, sku, label, price, quantity):
+        self.sku = sku
+        self.label = label
+        self.price = price
+        self.quantity = quantity
+
+    @property
+    def total(self):
+        return self.price * self.quantity
+
+    def __getstate__(self):
+        return (self.sku, self.label, self.price, self.quantity)
+
+    def __setstate__(self, state):
+        self.sku, self.label, self.price, self.quantity = state
+
+
+class Cart:
+    """
+    Cart keyed by SKU with running aggregates.
+    """
+
+    __slots__ = ('_lines', 'unit_count', 'total', 'catalog_version')
+
+    def __init__(self):
+        self._lines = {}
+        self.unit_count = 0
+        self.total = 0.0
+        self.catalog_version = None
+
+    @classmethod
+    def from_items(cls, items, snapshot, missing=None):
+        """
+        Build a cart from a list of item dicts ({'sku' or 'product': ...,
+        'quantity': ...}), as stored before this class existed and for past
+        orders and saved carts. Items whose product is no longer in the
+        catalog are dropped (and appended to `missing` if given).
+        """
+        cart = cls()
+        for item in items:
+            sku = item.get('sku')
+            product = snapshot.get(sku) if sku is not None else snapshot.find_label(item.get('product'))
+            if product is not None:
+                cart.add(product, item['quantity'])
+            elif missing is not None:
+                missing.append(item)
+        cart.catalog_version = snapshot.version
+        return cart
+
+    def to_items(self):
+        """
+        The lines as item dicts that from_items() reads back.
+        """
+        return [{'sku': line.sku, 'product': line.label, 'quantity': line.quantity} for line in self._lines.values()]
+
+    @property
+    def item_count(self):
+        """
+        Number of distinct products.
+        """
+        return len(self._lines)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def add(self, product, quantity):
+        """
+        Add quantity of product, merging with an existing line for its SKU.
+        """
+        line = self._lines.get(product.sku)
+        if line is None:
+            line = self._lines[product.sku] = CartLine(product.sku, product.label, product.price, 0)
+        line.quantity += quantity
+        self.unit_count += quantity
+        self.total += product.price * quantity
+        return line
+
+    def remove(self, sku):
+        """
+        Remove the line for sku; returns it, or None if it was not in the cart.
+        """
+        line = self._lines.pop(sku, None)
+        if line is not None:
+            self.unit_count -= line.quantity
+            self.total -= line.total
+        return line
+
+    def set_quantity(self, sku, quantity):
+        """
+        Change the quantity of the line for sku (removing it at 0). Returns the
+        line, or None if it was not in the cart.
+        """
+        line = self._lines.get(sku)
+        if line is None:
+            return None
+        if quantity <= 0:
+            return self.remove(sku)
+        self.unit_count += quantity - line.quantity
+        self.total += line.price * (quantity - line.quantity)
+        line.quantity = quantity
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self.unit_count = 0
+        self.total = 0.0
+
+    def reprice(self, snapshot):
+        """
+        Update labels and prices from a catalog snapshot and drop products it
+        no longer sells. Does nothing if the cart was already checked against
+        this snapshot. Returns the dropped lines.
+        """
+        if self.catalog_version == snapshot.version:
+            return []
+        dropped = []
+        unit_count, total = 0, 0.0
+        for sku, line in list(self._lines.items()):
+            product = snapshot.get(sku)
+            if product is None:
+                dropped.append(self._lines.pop(sku))
+                continue
+            line.label, line.price = product.label, product.price
+            unit_count += line.quantity
+            total += line.total
+        self.unit_count, self.total = unit_count, total
+        self.catalog_version = snapshot.version
+        return dropped
+
+    def render(self):
+        """
+        Build the review text, the order summary, the HTML list and the
+        (line, total) pairs for storage in a single pass.
+        """
+        review, summary, html, lines = [], [], [], []
+        for idx, line in enumerate(self._lines.values(), 1):
+            line_total = line.total
+            review.append(f"{idx}. {line.label}\n   Qty: {line.quantity} × ₹{line.price:.0f} = ₹{line_total:.0f}\n\n")
+            summary.append(f"  • {line.label}\n    ₹{line.price:.0f} × {line.quantity} = ₹{line_total:.0f}\n")
+            html.append(f"<li>{line.label} (₹{line.price:.0f} × {line.quantity}) = ₹{line_total:.0f}</li>")
+            lines.append((line, line_total))
+        return CartView(''.join(review), ''.join(summary), ''.join(html), lines)
+
+    def __getstate__(self):
+        return (list(self._lines.values()), self.catalog_version)
+
+    def __setstate__(self, state):
+        lines, self.catalog_version = state
+        self._lines = {line.sku: line for line in lines}
+        self.unit_count = sum(line.quantity for line in lines)
+        self.total = sum(line.total for line in lines)
@@ -0,0 +1,171 @@
+"""
+Product catalog for the Telegram Order Bot
+Products (SKU, label, price, stock, category) are loaded from a JSON file into
+an immutable snapshot with label -> SKU and SKU -> product indexes. When the
+file changes, a new snapshot is built and swapped in with one assignment, so
+handlers always see a complete, consistent catalog and prices can change
+without a redeploy.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# SKUs travel in inline button callback data, which Telegram caps at 64 bytes
+MAX_SKU_BYTES = 48
+
+
+@dataclass(frozen=True)
+class Product:
+    sku: str
+    label: str
+    price: float
+    stock: Optional[int] = None  # None = not tracked (unlimited)
+    category: str = "Other"
+
+
+def content_version(products):
+    """
+    Version number derived from the products (without stock) and their order.
+    It is the same in every process and after a restart for the same catalog
+    and changes with any SKU, label, price, category or position, so carts
+    and inline buttons from before a change are never mistaken for current
+    ones. Stock is tracked by the inventory and does not affect either.
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    for product in products:
+        digest.update(repr((product.sku, product.label, product.price, product.category)).encode())
+    return int.from_bytes(digest.digest(), 'big')
+
+
+class CatalogSnapshot:
+    """
+    One immutable version of the catalog.
+    """
+
+    __slots__ = ('products', 'by_sku', 'by_label', 'categories', 'version')
+
+    def __init__(self, products, version=None):
+        self.products = tuple(products)
+        self.by_sku = {product.sku: product for product in self.products}
+        self.by_label = {product.label: product for product in self.products}
+        categories = {}
+        for product in self.products:
+            categories.setdefault(product.category, []).append(product)
+        self.categories = {name: tuple(items) for name, items in categories.items()}
+        self.version = content_version(self.products) if version is None else version
+
+    def get(self, sku):
+        """
+        Product for sku, or None if it is not (or no longer) in the catalog.
+        """
+        return self.by_sku.get(sku)
+
+    def find_label(self, label):
+        """
+        Product whose button label is exactly label, or None.
+        """
+        return self.by_label.get(label)
+
+    @property
+    def labels(self):
+        return [product.label for product in self.products]
+
+    def __len__(self):
+        return len(self.products)
+
+
+def parse_products(data):
+    """
+    Validate raw catalog entries and turn them into Products.
+    Raises ValueError on missing fields, bad SKUs or prices, or duplicate SKUs/labels.
+    """
+    products = []
+    skus, labels = set(), set()
+    for entry in data:
+        try:
+            product = Product(
+                sku=str(entry['sku']),
+                label=str(entry['label']),
+                price=float(entry['price']),
+                stock=None if entry.get('stock') is None else int(entry['stock']),
+                category=str(entry.get('category') or "Other"),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"invalid catalog entry {entry!r}: {e}") from e
+        if not product.sku or len(product.sku.encode('utf-8')) > MAX_SKU_BYTES:
+            raise ValueError(f"SKU must be 1-{MAX_SKU_BYTES} bytes: {product.sku!r}")
+        if product.price < 0:
+            raise ValueError(f"negative price for {product.sku}")
+        if product.sku in skus:
+            raise ValueError(f"duplicate SKU {product.sku}")
+        if product.label in labels:
+            raise ValueError(f"duplicate label {product.label}")
+        skus.add(product.sku)
+        labels.add(product.label)
+        products.append(product)
+    return products
+
+
+class Catalog:
+    """
+    Holds the current CatalogSnapshot and reloads it when the file changes.
+    Listeners registered with on_change() are called after each swap, on the
+    thread that called load(); a listener that raises is logged and skipped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = CatalogSnapshot(())
+        self._mtime = None
+        self._listeners = []
+
+    def on_change(self, callback):
+        """
+        Call callback(snapshot) whenever a new snapshot is swapped in.
+        """
+        self._listeners.append(callback)
+
+    def load(self):
+        """
+        Load the catalog file and swap in the new snapshot.
+        Raises on a missing or invalid file (the previous snapshot stays active).
+        """
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding='utf-8') as f:
+            products = parse_products(json.load(f))
+        self.snapshot = CatalogSnapshot(products)
+        self._mtime = mtime
+        logger.info(f"🛍️ Catalog v{self.snapshot.version} loaded: {len(products)} products from {self.path}")
+        for callback in self._listeners:
+            # One failing listener must not keep the others from seeing the new snapshot
+            try:
+                callback(self.snapshot)
+            except Exception:
+                logger.exception(f"❌ Catalog listener {getattr(callback, '__qualname__', callback)!r} failed")
+        return self.snapshot
+
+    def reload_if_changed(self):
+        """
+        Reload if the file's modification time changed. Returns True on reload.
+        An invalid file is logged and ignored until it changes again.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.error(f"❌ Catalog file unavailable: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Keeping catalog v{self.snapshot.version}; could not reload {self.path}: {e}")
+            self._mtime = mtime
+            return False
+        return True
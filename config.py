@@ -30,12 +30,96 @@ SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
 SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 ORDER_NOTIFICATION_EMAIL = os.getenv('ORDER_NOTIFICATION_EMAIL', 'as1917378@gmail.com')
+# Set SMTP_STARTTLS=false for a local test server without TLS
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+# Reconnect when the SMTP session has been idle longer than this (seconds)
+SMTP_IDLE_TIMEOUT = int(os.getenv('SMTP_IDLE_TIMEOUT', '60'))
+# Max emails sent per batch over one session, and retries before giving up
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '20'))
+EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', '5'))
 
-# Validate configuration
-if not BOT_TOKEN:
-    raise ValueError("❌ ERROR: BOT_TOKEN not set! Please add it to .env file")
+# Owner notifications: one message per order until more than OWNER_DIGEST_THRESHOLD
+# orders arrive within a minute, then a digest every OWNER_DIGEST_INTERVAL seconds
+OWNER_DIGEST_THRESHOLD = int(os.getenv('OWNER_DIGEST_THRESHOLD', '10'))
+OWNER_DIGEST_INTERVAL = int(os.getenv('OWNER_DIGEST_INTERVAL', '60'))
+# Telegram messages per minute sent to the owner chat (Telegram allows ~20/min in groups)
+OWNER_MESSAGES_PER_MINUTE = int(os.getenv('OWNER_MESSAGES_PER_MINUTE', '20'))
 
-if not OWNER_CHAT_ID:
-    raise ValueError("❌ ERROR: OWNER_CHAT_ID not set! Please add it to .env file")
+# Outgoing Telegram API calls: overall and per-chat limits (Telegram allows about
+# 30 messages/s overall, 1/s per private chat and 20/min per group), and how
+# often a call is retried after a 429 "Flood control exceeded"
+TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv('TELEGRAM_MESSAGES_PER_SECOND', '30'))
+CHAT_MESSAGES_PER_SECOND = float(os.getenv('CHAT_MESSAGES_PER_SECOND', '1'))
+GROUP_MESSAGES_PER_MINUTE = float(os.getenv('GROUP_MESSAGES_PER_MINUTE', '20'))
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', '3'))
 
-print("✅ Configuration loaded successfully from .env file")
+# Prometheus-style metrics on http://METRICS_HOST:METRICS_PORT/metrics (port 0 = off)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+
+# Order storage
+# Orders are appended to a SQLite journal; orders.xlsx is only an export
+ORDERS_DB = os.getenv('ORDERS_DB', 'orders.db')
+# Rebuild orders.xlsx from the journal every N seconds (0 = only on demand)
+EXCEL_EXPORT_INTERVAL = int(os.getenv('EXCEL_EXPORT_INTERVAL', '0'))
+
+# Max updates handled at the same time (updates from one chat are always sequential)
+UPDATE_WORKERS = int(os.getenv('UPDATE_WORKERS', '32'))
+
+# Carts and conversation states (SQLite); PERSISTENCE_INTERVAL batches writes (seconds)
+STATE_DB = os.getenv('STATE_DB', ORDERS_DB)
+PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '10'))
+
+# Thread pools for blocking work, so handlers never block the event loop
+# Storage pool: SQLite writes and Excel exports. SMTP pool: order emails.
+IO_POOL_SIZE = int(os.getenv('IO_POOL_SIZE', '4'))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+
+# Optional FAQ file (JSON), checked for changes every FAQ_RELOAD_INTERVAL seconds
+FAQ_FILE = os.getenv('FAQ_FILE', 'faq.json')
+FAQ_RELOAD_INTERVAL = int(os.getenv('FAQ_RELOAD_INTERVAL', '30'))
+# Fuzzy FAQ search: cached index file and minimum similarity (0-1) to answer;
+# FAQIndex takes its default threshold from here
+FAQ_INDEX_CACHE = os.getenv('FAQ_INDEX_CACHE', 'faq_index.npz')
+FAQ_MIN_SIMILARITY = float(os.getenv('FAQ_MIN_SIMILARITY', '0.5'))
+
+# Product catalog (JSON), checked for changes every CATALOG_RELOAD_INTERVAL seconds
+CATALOG_FILE = os.getenv('CATALOG_FILE', 'products.json')
+CATALOG_RELOAD_INTERVAL = int(os.getenv('CATALOG_RELOAD_INTERVAL', '30'))
+# Products per inline keyboard page when browsing the catalog
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', '8'))
+# Stock put in a cart stays reserved for this many seconds after the cart was last changed
+RESERVATION_TTL = int(os.getenv('RESERVATION_TTL', '900'))
+
+# How the bot receives updates: "polling" (default) or "webhook"
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+# Polling only: discard updates that arrived while the bot was down
+DROP_PENDING_UPDATES = os.getenv('DROP_PENDING_UPDATES', 'false').lower() in ('1', 'true', 'yes')
+
+# Webhook server settings (BOT_MODE=webhook)
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+# Telegram sends this in X-Telegram-Bot-Api-Secret-Token; requests without it are rejected.
+# Required in webhook mode (1-256 characters: A-Z, a-z, 0-9, _ and -)
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+# Public HTTPS base URL; when set, the webhook is registered with Telegram on startup
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+
+
+def validate():
+    """
+    Check the required settings. Called by bot.main() at startup rather than
+    on import, so tools and benchmarks can import the modules without a token.
+    """
+    if not BOT_TOKEN:
+        raise ValueError("❌ ERROR: BOT_TOKEN not set! Please add it to .env file")
+
+    if not OWNER_CHAT_ID:
+        raise ValueError("❌ ERROR: OWNER_CHAT_ID not set! Please add it to .env file")
+
+    if BOT_MODE == 'webhook' and not WEBHOOK_SECRET_TOKEN:
+        # Without it anyone who can reach the port could post forged updates
+        raise ValueError("❌ ERROR: WEBHOOK_SECRET_TOKEN not set! It is required when BOT_MODE=webhook")
+
+    print("✅ Configuration loaded successfully from .env file")
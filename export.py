@@ -0,0 +1,135 @@
+"""
+Streaming order export for the Telegram Order Bot
+Orders are read from the journal in fixed-size chunks and written straight to
+the output file, so memory stays flat however many orders are exported:
+
+- xlsx: openpyxl write-only workbook (rows go to disk as they are appended)
+- csv: the standard csv module
+- parquet: one pyarrow row group per chunk (optional: pip install pyarrow)
+
+Usage: python export.py OUTPUT [--db orders.db] [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--customer ID]
+"""
+
+import csv
+import logging
+import os
+from datetime import date, timedelta
+
+from storage import ORDER_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('xlsx', 'csv', 'parquet')
+CHUNK_SIZE = 5000
+
+
+def day_after(day):
+    """
+    'YYYY-MM-DD' -> the following day, for inclusive "to" dates.
+    """
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def format_for(path):
+    """
+    Output format from the file extension.
+    """
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r} (use one of: {', '.join(FORMATS)})")
+    return fmt
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    sheet.append(ORDER_COLUMNS)
+    count = 0
+    for chunk in chunks:
+        for row in chunk:
+            sheet.append(row)
+        count += len(chunk)
+    workbook.save(path)
+    return count
+
+
+def _write_csv(chunks, path):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ORDER_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def _write_parquet(chunks, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema([
+        ('Order ID', pa.int64()),
+        ('Customer ID', pa.string()),
+        ('Username', pa.string()),
+        ('Product', pa.string()),
+        ('Quantity', pa.int64()),
+        ('Price', pa.float64()),
+        ('Total', pa.float64()),
+        ('Date', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {'xlsx': _write_xlsx, 'csv': _write_csv, 'parquet': _write_parquet}
+
+
+def export_orders(journal, path, date_from=None, date_to=None, customer_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream the journal's order lines to path (format from its extension).
+    date_from/date_to are 'YYYY-MM-DD' days, both inclusive.
+    Returns the number of exported rows.
+    """
+    writer = WRITERS[format_for(path)]
+    if date_from:
+        date.fromisoformat(date_from)  # ValueError on a malformed day
+    chunks = journal.iter_rows(
+        date_from=date_from,
+        date_to=day_after(date_to) if date_to else None,
+        customer_id=customer_id,
+        chunk_size=chunk_size,
+    )
+    count = writer(chunks, path)
+    logger.info(f"📤 Exported {count} order rows to {path}")
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from storage import OrderJournal
+
+    parser = argparse.ArgumentParser(description="Export orders to xlsx, csv or parquet.")
+    parser.add_argument('output', help="output file; the extension picks the format")
+    parser.add_argument('--db', default=os.getenv('ORDERS_DB', 'orders.db'))
+    parser.add_argument('--from', dest='date_from', help="first day, YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="last day, YYYY-MM-DD")
+    parser.add_argument('--customer', help="Telegram user ID")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    export_orders(OrderJournal(args.db), args.output, args.date_from, args.date_to, args.customer)
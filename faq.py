@@ -0,0 +1,153 @@
+"""
+FAQ matching for the Telegram Order Bot
+All FAQ questions and their aliases are compiled into one Aho-Corasick
+automaton, so a message is scanned once no matter how many FAQs exist.
+When several phrases occur in a message, the longest (most specific) one wins;
+ties go to the FAQ listed first.
+"""
+
+import json
+import logging
+import os
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class _Automaton:
+    """
+    Immutable Aho-Corasick automaton over lowercase phrases.
+    best[node] holds the winning phrase ending at node (following suffix
+    links), precomputed so matching does one lookup per character.
+    """
+
+    __slots__ = ('goto', 'fail', 'best', 'answers', 'phrase_count')
+
+    def __init__(self, phrases):
+        # phrases: list of (phrase, answer, priority)
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+        self.answers = []
+        self.phrase_count = 0
+
+        for phrase, answer, priority in phrases:
+            phrase = phrase.lower().strip()
+            if not phrase:
+                continue
+            node = 0
+            for char in phrase:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = nxt
+            candidate = (len(phrase), -priority, len(self.answers))
+            if self.best[node] is None or candidate > self.best[node]:
+                self.best[node] = candidate
+            self.answers.append(answer)
+            self.phrase_count += 1
+
+        # Breadth-first pass: suffix links, and inherit the best match from them
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            inherited = self.best[self.fail[node]]
+            if inherited is not None and (self.best[node] is None or inherited > self.best[node]):
+                self.best[node] = inherited
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[child] = target if target != child else 0
+
+    def search(self, text):
+        goto, fail, best = self.goto, self.fail, self.best
+        state = 0
+        winner = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = best[state]
+            if found is not None and (winner is None or found > winner):
+                winner = found
+        return self.answers[winner[2]] if winner is not None else None
+
+
+class FAQMatcher:
+    """
+    Matches customer messages against FAQs and their aliases.
+    load() builds a new automaton and swaps it in with one assignment, so it is
+    safe to reload while messages are being matched.
+    """
+
+    def __init__(self, faqs=None, aliases=None):
+        self._automaton = _Automaton([])
+        self._source_mtime = None
+        self.faqs = {}
+        self.aliases = {}
+        if faqs:
+            self.load(faqs, aliases)
+
+    def load(self, faqs, aliases=None):
+        """
+        Compile {question: answer} plus {question: [alias, ...]}.
+        """
+        aliases = aliases or {}
+        phrases = []
+        for priority, (question, answer) in enumerate(faqs.items()):
+            phrases.append((question, answer, priority))
+            for alias in aliases.get(question, ()):
+                phrases.append((alias, answer, priority))
+        self._automaton = _Automaton(phrases)
+        self.faqs, self.aliases = dict(faqs), dict(aliases)
+        logger.info(f"❓ FAQ matcher compiled: {len(faqs)} FAQs, {self._automaton.phrase_count} phrases")
+
+    def load_file(self, path):
+        """
+        Load FAQs from a JSON file: {"question": {"answer": "...", "aliases": [...]}}
+        (a plain string value is treated as the answer with no aliases).
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        faqs, aliases = {}, {}
+        for question, entry in data.items():
+            if isinstance(entry, str):
+                faqs[question] = entry
+            else:
+                faqs[question] = entry['answer']
+                aliases[question] = entry.get('aliases', [])
+        self.load(faqs, aliases)
+        self._source_mtime = os.path.getmtime(path)
+
+    def reload_if_changed(self, path):
+        """
+        Reload from path if the file changed since the last load.
+        Returns True when a reload happened. A broken file keeps the old FAQs.
+        """
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if mtime == self._source_mtime:
+            return False
+        try:
+            self.load_file(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"❌ Could not reload FAQs from {path}: {e}")
+            self._source_mtime = mtime
+            return False
+        logger.info(f"🔄 FAQs reloaded from {path}")
+        return True
+
+    def match(self, message_text):
+        """
+        Return the answer for the most specific FAQ phrase in the message, or None.
+        """
+        return self._automaton.search(message_text.lower())
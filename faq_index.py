@@ -0,0 +1,204 @@
+"""
+Fuzzy FAQ retrieval for the Telegram Order Bot
+Questions and aliases are turned into TF-IDF vectors over character n-grams
+(so "shiping" still looks like "shipping") and stored as an inverted index in
+NumPy arrays. A query is answered with one vectorized gather + bincount over
+the rows that share n-grams with it, then accepted only above a similarity
+threshold. The index is cached to disk and rebuilt only when the FAQs change.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from config import FAQ_MIN_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZES = (3, 4)
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def extract_features(text):
+    """
+    Character n-grams of each word (padded with spaces) plus whole words.
+    """
+    features = Counter()
+    for word in _NON_WORD.sub(' ', text.lower()).split():
+        features['w:' + word] += 1
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                features[padded[i:i + size]] += 1
+    return features
+
+
+class FAQIndex:
+    """
+    TF-IDF inverted index: for each feature column, the FAQ phrases (rows)
+    containing it and their L2-normalized weights.
+    """
+
+    def __init__(self, min_similarity=FAQ_MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.fingerprint = None
+        self._vocab = {}
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._row_answer = np.zeros(0, dtype=np.int32)
+        self._answers = []
+
+    @staticmethod
+    def _phrases(faqs, aliases):
+        phrases = []
+        for question in faqs:
+            phrases.append((question, question))
+            for alias in (aliases or {}).get(question, ()):
+                phrases.append((alias, question))
+        return phrases
+
+    @staticmethod
+    def compute_fingerprint(faqs, aliases):
+        payload = json.dumps([faqs, aliases or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def build(self, faqs, aliases=None):
+        """
+        Build the index from {question: answer} and {question: [alias, ...]}.
+        """
+        phrases = self._phrases(faqs, aliases)
+        questions = list(faqs)
+        question_pos = {question: i for i, question in enumerate(questions)}
+        docs = [extract_features(text) for text, _ in phrases]
+
+        vocab = {}
+        doc_freq = Counter()
+        for doc in docs:
+            for feature in doc:
+                if feature not in vocab:
+                    vocab[feature] = len(vocab)
+                doc_freq[feature] += 1
+        n_docs = max(len(docs), 1)
+        idf = np.zeros(len(vocab), dtype=np.float32)
+        for feature, col in vocab.items():
+            idf[col] = math.log((1 + n_docs) / (1 + doc_freq[feature])) + 1.0
+
+        # Collect (col, row, weight) triples, normalizing each row
+        cols, rows, weights = [], [], []
+        for row, doc in enumerate(docs):
+            doc_cols = np.fromiter((vocab[f] for f in doc), dtype=np.int64, count=len(doc))
+            doc_weights = np.fromiter(doc.values(), dtype=np.float32, count=len(doc)) * idf[doc_cols]
+            norm = float(np.linalg.norm(doc_weights)) or 1.0
+            cols.append(doc_cols)
+            rows.append(np.full(len(doc), row, dtype=np.int32))
+            weights.append(doc_weights / norm)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32)
+
+        order = np.argsort(cols, kind='stable')
+        self._vocab = vocab
+        self._idf = idf
+        self._indptr = np.concatenate(([0], np.cumsum(np.bincount(cols, minlength=len(vocab))))).astype(np.int64)
+        self._rows = rows[order]
+        self._weights = weights[order].astype(np.float32)
+        self._row_answer = np.array([question_pos[q] for _, q in phrases], dtype=np.int32)
+        self._answers = [faqs[q] for q in questions]
+        self.fingerprint = self.compute_fingerprint(faqs, aliases)
+        logger.info(f"🔎 FAQ index built: {len(phrases)} phrases, {len(vocab)} features")
+
+    def save(self, path):
+        """
+        Write the index to a .npz cache file.
+        """
+        vocab = sorted(self._vocab, key=self._vocab.get)
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                fingerprint=np.array(self.fingerprint),
+                vocab=np.array(json.dumps(vocab, ensure_ascii=False)),
+                answers=np.array(json.dumps(self._answers, ensure_ascii=False)),
+                idf=self._idf,
+                indptr=self._indptr,
+                rows=self._rows,
+                weights=self._weights,
+                row_answer=self._row_answer,
+            )
+
+    def load(self, path):
+        """
+        Read the index from a cache file written by save().
+        """
+        with np.load(path, allow_pickle=False) as data:
+            self.fingerprint = str(data['fingerprint'])
+            self._vocab = {feature: col for col, feature in enumerate(json.loads(str(data['vocab'])))}
+            self._answers = json.loads(str(data['answers']))
+            self._idf = data['idf']
+            self._indptr = data['indptr']
+            self._rows = data['rows']
+            self._weights = data['weights']
+            self._row_answer = data['row_answer']
+
+    def load_or_build(self, faqs, aliases=None, cache_path=None):
+        """
+        Use the cached index if it was built from the same FAQs, else rebuild
+        it and refresh the cache.
+        """
+        fingerprint = self.compute_fingerprint(faqs, aliases)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                self.load(cache_path)
+                if self.fingerprint == fingerprint:
+                    logger.info(f"🔎 FAQ index loaded from {cache_path}")
+                    return
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ Ignoring unreadable FAQ index cache {cache_path}: {e}")
+        self.build(faqs, aliases)
+        if cache_path:
+            try:
+                self.save(cache_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write FAQ index cache {cache_path}: {e}")
+
+    def search(self, message_text):
+        """
+        Return (answer, similarity) for the closest FAQ phrase, or (None, score)
+        when nothing reaches min_similarity.
+        """
+        features = extract_features(message_text)
+        known = [(self._vocab[f], count) for f, count in features.items() if f in self._vocab]
+        if not known:
+            return None, 0.0
+        cols = np.fromiter((col for col, _ in known), dtype=np.int64, count=len(known))
+        query = np.fromiter((count for _, count in known), dtype=np.float32, count=len(known)) * self._idf[cols]
+        # Unseen features still count towards the query's length, at the highest idf
+        unseen_idf = math.log(1 + len(self._row_answer)) + 1.0
+        unseen = sum((count * unseen_idf) ** 2 for f, count in features.items() if f not in self._vocab)
+        norm = math.sqrt(float(query @ query) + unseen)
+        query /= norm
+
+        starts = self._indptr[cols]
+        lengths = self._indptr[cols + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return None, 0.0
+        # Positions of every posting of every query column, in one vectorized step
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        scores = np.bincount(
+            self._rows[offsets],
+            weights=self._weights[offsets] * np.repeat(query, lengths),
+            minlength=len(self._row_answer),
+        )
+        best = int(scores.argmax())
+        similarity = float(scores[best])
+        if similarity < self.min_similarity:
+            return None, similarity
+        return self._answers[self._row_answer[best]], similarity
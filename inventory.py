@@ -0,0 +1,283 @@
+"""
+Inventory for the Telegram Order Bot
+Products with a `stock` in the catalog are reserved when they go into a cart
+and sold when the order is confirmed. Availability checks, reservations and
+releases only touch in-memory per-SKU counters, and they run on the event loop
+with no await between check and update, so concurrent checkouts can never
+reserve the same unit twice.
+
+Stock levels are kept in the order database. A sale is written in the
+order's own transaction (as an OrderJournal commit hook), so a crash can never
+lose a sale. The UPDATE refuses to take stock below zero, which aborts the
+order if another bot process sold the last units first.
+"""
+
+import logging
+import time
+
+from storage import JournalHook
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    """
+    Raised inside the order transaction when a line exceeds the stored stock.
+    """
+
+    def __init__(self, shortages):
+        super().__init__(f"not enough stock for {', '.join(shortages)}")
+        self.shortages = shortages  # {sku: units in stock}
+
+
+class _Hold:
+    """
+    Units reserved by one customer's cart.
+    """
+
+    __slots__ = ('lines', 'expires_at')
+
+    def __init__(self):
+        self.lines = {}  # sku -> reserved units
+        self.expires_at = 0.0
+
+
+class Inventory(JournalHook):
+    """
+    Per-SKU stock and reservations, plus the `inventory` table they are
+    persisted in. Registers itself as a commit hook of the given OrderJournal.
+
+    A product's stock in the catalog sets its units on hand; orders then
+    count it down. Changing the number in the catalog sets it again.
+    Products without a stock are not tracked (never sold out).
+    """
+
+    def __init__(self, journal, ttl=900):
+        super().__init__(journal)
+        self.ttl = ttl
+        # (generation, {sku: units in stock}) for tracked SKUs, replaced in
+        # one assignment; the generation counts reads of the stored levels
+        self._stock = (0, {})
+        self._generation = 0
+        self._sale_generations = {}  # holder -> generation when their sale was written
+        self._reserved = {}  # sku -> units held by carts
+        self._holds = {}  # holder (Telegram user ID) -> _Hold
+
+    def create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS inventory (
+                sku TEXT PRIMARY KEY,
+                on_hand INTEGER NOT NULL,
+                catalog_stock INTEGER NOT NULL
+            )
+            """
+        )
+
+    def apply_order(self, conn, order, lines):
+        """
+        Count the order's lines off the stored stock. Called inside the
+        journal's transaction; raises OutOfStock to abort the order.
+        """
+        # No level read can happen until this transaction ends (see _load_levels)
+        self._sale_generations[order['Customer ID']] = self._generation
+        shortages = {}
+        for line in lines:
+            sku, quantity = line.get('SKU'), int(line['Quantity'])
+            if sku is None:
+                continue
+            updated = conn.execute(
+                "UPDATE inventory SET on_hand = on_hand - ? WHERE sku = ? AND on_hand >= ?",
+                (quantity, sku, quantity),
+            ).rowcount
+            if not updated:
+                row = conn.execute("SELECT on_hand FROM inventory WHERE sku = ?", (sku,)).fetchone()
+                if row is not None:
+                    shortages[sku] = row[0]
+        if shortages:
+            raise OutOfStock(shortages)
+
+    # -- stock levels ----------------------------------------------------------
+
+    def sync(self, snapshot):
+        """
+        Catalog listener: start tracking products that have a stock, reset
+        on-hand units where the catalog's number changed, and stop tracking
+        the rest. Then load the stored levels.
+        """
+        stocks = {product.sku: product.stock for product in snapshot.products if product.stock is not None}
+        with self._lock:
+            conn = self._connect()
+            stored = dict(conn.execute("SELECT sku, catalog_stock FROM inventory"))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO inventory (sku, on_hand, catalog_stock) VALUES (?, ?, ?) "
+                    "ON CONFLICT(sku) DO UPDATE SET on_hand = excluded.on_hand, catalog_stock = excluded.catalog_stock",
+                    [(sku, stock, stock) for sku, stock in stocks.items() if stored.get(sku) != stock],
+                )
+                conn.executemany(
+                    "DELETE FROM inventory WHERE sku = ?", [(sku,) for sku in stored if sku not in stocks]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            levels = self._load_levels(conn)
+        changed = sum(1 for sku, stock in stocks.items() if stored.get(sku) != stock)
+        logger.info(f"📦 Inventory: tracking {len(levels)} products ({changed} stock level(s) set from the catalog)")
+
+    def refresh(self):
+        """
+        Reload on-hand units from the database (e.g. after another process
+        sold stock this one still counted as available).
+        """
+        with self._lock:
+            self._load_levels(self._connect())
+
+    def _load_levels(self, conn):
+        """
+        Read the stored levels and swap them in with a new generation. Held
+        under the journal's lock, so every read is ordered before or after
+        each sale's transaction, and commit() knows whether a sale it
+        processes is already part of the levels.
+        """
+        with self.journal._lock:
+            levels = dict(conn.execute("SELECT sku, on_hand FROM inventory"))
+            self._generation += 1
+            self._stock = (self._generation, levels)
+        return levels
+
+    @property
+    def _on_hand(self):
+        return self._stock[1]
+
+    def is_tracked(self, sku):
+        return sku in self._on_hand
+
+    def available(self, sku):
+        """
+        Units that can still be reserved, or None if sku is not tracked.
+        """
+        on_hand = self._on_hand.get(sku)
+        if on_hand is None:
+            return None
+        return max(0, on_hand - self._reserved.get(sku, 0))
+
+    # -- reservations ----------------------------------------------------------
+
+    def _hold(self, holder):
+        hold = self._holds.get(holder)
+        if hold is None:
+            hold = self._holds[holder] = _Hold()
+        hold.expires_at = time.monotonic() + self.ttl
+        return hold
+
+    def _adjust(self, hold, sku, delta):
+        held = hold.lines.get(sku, 0) + delta
+        if held:
+            hold.lines[sku] = held
+        else:
+            hold.lines.pop(sku, None)
+        reserved = self._reserved.get(sku, 0) + delta
+        if reserved:
+            self._reserved[sku] = reserved
+        else:
+            self._reserved.pop(sku, None)
+
+    def reserve(self, holder, sku, quantity):
+        """
+        Reserve quantity more units of sku for holder's cart. Returns False
+        (reserving nothing) if fewer units are available. Untracked products
+        always succeed without a reservation.
+        """
+        available = self.available(sku)
+        if available is None:
+            return True
+        if quantity > available:
+            return False
+        self._adjust(self._hold(holder), sku, quantity)
+        return True
+
+    def release(self, holder, sku=None):
+        """
+        Give back holder's reservation for sku, or all of it.
+        """
+        if sku is None:
+            self._sale_generations.pop(holder, None)
+        hold = self._holds.get(holder)
+        if hold is None:
+            return
+        for line_sku, held in list(hold.lines.items()):
+            if sku is None or line_sku == sku:
+                self._adjust(hold, line_sku, -held)
+        if not hold.lines:
+            del self._holds[holder]
+
+    def expire(self):
+        """
+        Release reservations of carts left untouched for longer than the TTL.
+        Returns the number of carts released.
+        """
+        now = time.monotonic()
+        expired = [holder for holder, hold in self._holds.items() if hold.expires_at <= now]
+        for holder in expired:
+            self.release(holder)
+        if expired:
+            logger.info(f"⏳ Released stock held by {len(expired)} idle cart(s)")
+        return len(expired)
+
+    @property
+    def holders(self):
+        """
+        Carts currently holding stock.
+        """
+        return len(self._holds)
+
+    def check_out(self, holder, quantities):
+        """
+        Make holder's reservation match the cart exactly ({sku: quantity}),
+        reserving again whatever expired or was lost in a restart. Returns
+        {sku: available units} for lines that cannot be covered; then nothing
+        is changed.
+        """
+        hold = self._holds.get(holder)
+        held = hold.lines if hold is not None else {}
+        shortages = {}
+        for sku, quantity in quantities.items():
+            available = self.available(sku)
+            if available is not None and quantity - held.get(sku, 0) > available:
+                shortages[sku] = available + held.get(sku, 0)
+        if shortages:
+            return shortages
+        hold = self._hold(holder)
+        for sku in list(hold.lines):
+            if sku not in quantities:
+                self._adjust(hold, sku, -hold.lines[sku])
+        for sku, quantity in quantities.items():
+            if self.is_tracked(sku):
+                self._adjust(hold, sku, quantity - hold.lines.get(sku, 0))
+        if not hold.lines:
+            del self._holds[holder]
+        return {}
+
+    def commit(self, holder):
+        """
+        The order was stored: turn holder's reservation into a sale. Levels
+        read after the sale was written (by sync() or refresh() on the storage
+        pool) already include it and are not counted down again.
+        """
+        sale_generation = self._sale_generations.pop(holder, None)
+        hold = self._holds.pop(holder, None)
+        if hold is None:
+            return
+        generation, on_hand = self._stock
+        counted = sale_generation is not None and generation > sale_generation
+        for sku, quantity in hold.lines.items():
+            if sku in on_hand and not counted:
+                on_hand[sku] -= quantity
+            reserved = self._reserved.get(sku, 0) - quantity
+            if reserved > 0:
+                self._reserved[sku] = reserved
+            else:
+                self._reserved.pop(sku, None)
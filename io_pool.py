@@ -0,0 +1,109 @@
+"""
+Executor-backed I/O layer for the Telegram Order Bot
+Blocking work (SQLite writes, SMTP, Excel exports) runs on bounded thread pools
+so async handlers can await it without freezing the event loop for other users.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingIOPool:
+    """
+    Bounded thread pool that async handlers await.
+    Tracks queue depth (jobs waiting for a free worker), in-flight jobs and
+    how long jobs waited before starting. If a latency histogram (labels:
+    pool, operation) is given, each job's total time is recorded in it.
+    """
+
+    def __init__(self, name, max_workers, latency=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.latency = latency
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-io")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+
+    @property
+    def queue_depth(self):
+        """
+        Jobs submitted but not yet picked up by a worker thread.
+        """
+        return self.submitted - self.started
+
+    @property
+    def in_flight(self):
+        """
+        Jobs currently running on a worker thread.
+        """
+        return self.started - self.completed - self.failed
+
+    def _call(self, func, submitted_at):
+        with self._lock:
+            self.started += 1
+            self.total_wait_seconds += time.perf_counter() - submitted_at
+        try:
+            result = func()
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) on the pool and await its result.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+            depth = self.submitted - self.started
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+        if depth > self.max_workers:
+            logger.warning(f"⚠️ {self.name} I/O pool backlog: {depth} queued jobs")
+        call = functools.partial(func, *args, **kwargs)
+        submitted_at = time.perf_counter()
+        if self.latency is None:
+            return await loop.run_in_executor(self._executor, self._call, call, submitted_at)
+        try:
+            return await loop.run_in_executor(self._executor, self._call, call, submitted_at)
+        finally:
+            operation = getattr(func, '__qualname__', type(func).__name__)
+            self.latency.labels(self.name, operation).observe(time.perf_counter() - submitted_at)
+
+    def stats(self):
+        """
+        Snapshot of the pool counters.
+        """
+        with self._lock:
+            return {
+                'pool': self.name,
+                'max_workers': self.max_workers,
+                'queue_depth': self.submitted - self.started,
+                'in_flight': self.started - self.completed - self.failed,
+                'max_queue_depth': self.max_queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_ms': (self.total_wait_seconds / self.started * 1000) if self.started else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting work and (optionally) wait for running jobs.
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,148 @@
+"""
+Keyboard registry for the Telegram Order Bot
+Reply keyboards are built once and reused for every message. Telegram markup
+objects are immutable, so the same instance can be sent to any number of chats.
+Keyboards derived from the product catalog are rebuilt after invalidate().
+
+CatalogPages splits a catalog snapshot into fixed-size pages per category once,
+so every browsing screen is an inline keyboard of at most page_size products
+(plus navigation), however large the catalog grows.
+"""
+
+import logging
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+logger = logging.getLogger(__name__)
+
+
+class KeyboardRegistry:
+    """
+    Named, lazily built and cached keyboards.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._cache = {}
+
+    def register(self, name, builder):
+        """
+        Register a zero-argument function that builds the keyboard called name.
+        """
+        self._builders[name] = builder
+        self._cache.pop(name, None)
+
+    def get(self, name):
+        """
+        Return the cached keyboard, building it on first use.
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            markup = self._cache[name] = self._builders[name]()
+            return markup
+
+    def invalidate(self, *names):
+        """
+        Drop cached keyboards (all of them when no names are given) so the
+        next get() rebuilds them, e.g. after the catalog changes.
+        """
+        if not names:
+            self._cache.clear()
+        for name in names:
+            self._cache.pop(name, None)
+        logger.info(f"⌨️ Keyboards invalidated: {', '.join(names) or 'all'}")
+
+
+# Inline button callback data:
+#   cm:<version>:<page>             category menu page
+#   cp:<version>:<category>:<page>  product page of a category (by position)
+#   pk:<sku>                        product picked
+# The version ties positions to the snapshot they were built from; it is derived
+# from the catalog contents, so buttons from before a restart are checked too.
+NOOP = "noop"
+
+
+def parse_callback(data):
+    """
+    Split callback data into (kind, fields), e.g. ('cp', ['3', '0', '1']).
+    """
+    kind, _, rest = (data or "").partition(":")
+    return kind, rest.split(":") if rest else []
+
+
+class CatalogPages:
+    """
+    Precomputed per-category page index for one catalog snapshot.
+    Inline keyboards are built on first use and cached with the index.
+    """
+
+    def __init__(self, snapshot, page_size=8):
+        self.version = snapshot.version
+        self.page_size = max(1, page_size)
+        self.categories = list(snapshot.categories)
+        self.category_pages = [
+            self._paginate(snapshot.categories[name]) for name in self.categories
+        ]
+        self.menu_pages = self._paginate(range(len(self.categories)))
+        self._markups = {}
+
+    def _paginate(self, items):
+        items = tuple(items)
+        return [items[i:i + self.page_size] for i in range(0, len(items), self.page_size)] or [()]
+
+    def _nav_row(self, page, page_count, data_for):
+        if page_count <= 1:
+            return []
+        row = []
+        if page > 0:
+            row.append(InlineKeyboardButton("◀️", callback_data=data_for(page - 1)))
+        row.append(InlineKeyboardButton(f"{page + 1}/{page_count}", callback_data=NOOP))
+        if page < page_count - 1:
+            row.append(InlineKeyboardButton("▶️", callback_data=data_for(page + 1)))
+        return [row]
+
+    def category_menu(self, page=0):
+        """
+        Return (text, markup) for a page of the category menu.
+        """
+        page = min(max(page, 0), len(self.menu_pages) - 1)
+        key = ('cm', page)
+        if key not in self._markups:
+            rows = [
+                [InlineKeyboardButton(
+                    f"{self.categories[index]} ({sum(len(p) for p in self.category_pages[index])})",
+                    callback_data=f"cp:{self.version}:{index}:0",
+                )]
+                for index in self.menu_pages[page]
+            ]
+            rows += self._nav_row(page, len(self.menu_pages), lambda p: f"cm:{self.version}:{p}")
+            self._markups[key] = ("📂 Choose a category:", InlineKeyboardMarkup(rows))
+        return self._markups[key]
+
+    def product_page(self, category, page=0):
+        """
+        Return (text, markup) for one page of products in a category
+        (category is its position in self.categories).
+        """
+        pages = self.category_pages[category]
+        page = min(max(page, 0), len(pages) - 1)
+        key = ('cp', category, page)
+        if key not in self._markups:
+            rows = [
+                [InlineKeyboardButton(f"{product.label} · ₹{product.price:.0f}", callback_data=f"pk:{product.sku}")]
+                for product in pages[page]
+            ]
+            rows += self._nav_row(page, len(pages), lambda p: f"cp:{self.version}:{category}:{p}")
+            if len(self.categories) > 1:
+                rows.append([InlineKeyboardButton("⬅️ Categories", callback_data=f"cm:{self.version}:0")])
+            self._markups[key] = (f"📂 {self.categories[category]}", InlineKeyboardMarkup(rows))
+        return self._markups[key]
+
+    def first_screen(self):
+        """
+        The category menu, or the only category's first page when there is one.
+        """
+        if len(self.categories) == 1:
+            return self.product_page(0)
+        return self.category_menu()
@@ -0,0 +1,264 @@
+"""
+Metrics for the Telegram Order Bot
+Counters, gauges and histograms in the Prometheus text format, served on a
+local /metrics endpoint. Recording is a dict lookup and an addition (plus a
+bisect for histograms), cheap enough for every handler call. Everything is
+recorded from the event loop thread, so there are no locks.
+
+Handlers are timed with the @timed decorator:
+
+    @timed
+    async def confirm_order(update, context): ...
+"""
+
+import bisect
+import functools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a fast FAQ reply up to a slow export or SMTP round trip
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # collect() -> {label values tuple: value}, read at scrape time instead of recorded
+        self.collect = collect
+        self._children = {}
+        if not self.labelnames and collect is None:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """
+        The child metric for one combination of label values (cached).
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        if self.collect is not None:
+            return [('', values, value) for values, value in self.collect().items()]
+        return [('', values, child.value) for values, child in self._children.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, value, *extra in self._samples():
+            labels = _format_labels(self.labelnames, values, extra[0] if extra else ())
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count (e.g. orders placed).
+    """
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._children[()].value += amount
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (e.g. conversations in a state).
+    """
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._children[()].value = value
+
+    def inc(self, amount=1):
+        self._children[()].value += amount
+
+    def dec(self, amount=1):
+        self._children[()].value -= amount
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. handler latency in seconds).
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def _samples(self):
+        samples = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                samples.append(('_bucket', values, cumulative, (('le', _format_value(float(bound))),)))
+            samples.append(('_sum', values, child.sum))
+            samples.append(('_count', values, child.count))
+        return samples
+
+
+class Registry:
+    """
+    The metrics served on /metrics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"❌ Could not collect metric {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=(), collect=None, registry=REGISTRY):
+    return registry.register(Counter(name, documentation, labelnames, collect))
+
+
+def gauge(name, documentation, labelnames=(), collect=None, registry=REGISTRY):
+    return registry.register(Gauge(name, documentation, labelnames, collect))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+HANDLER_SECONDS = histogram('bot_handler_seconds', 'Time spent in each update handler', ['handler'])
+
+
+def timed(func):
+    """
+    Handler decorator: record the call's duration in bot_handler_seconds.
+    Exceptions are tagged with the handler's name (e.handler, innermost
+    handler wins) and counted once, by the application's error handler.
+    """
+    latency = HANDLER_SECONDS.labels(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if not hasattr(e, 'handler'):
+                e.handler = func.__name__
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+    return wrapper
+
+
+async def start_metrics_server(host, port, registry=REGISTRY):
+    """
+    Serve GET /metrics on host:port. Returns the aiohttp runner (call
+    cleanup() to stop), or None if the port could not be opened.
+    """
+    # Imported here: aiohttp is slow to import and only needed when serving
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"❌ Metrics endpoint disabled, could not listen on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"📈 Metrics on http://{host}:{port}/metrics")
+    return runner
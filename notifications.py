@@ -0,0 +1,401 @@
+"""
+Background notifications for the Telegram Order Bot
+Order emails are put on an asyncio queue and sent by a single worker that keeps
+one authenticated SMTP session open, sends bursts of orders over it in batches
+and retries failed sends with exponential backoff.
+
+Owner notifications go through OwnerNotifier: one Telegram message (and email)
+per order at normal volume, switching to periodic digests during bursts.
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPSession:
+    """
+    A persistent, lazily (re)connected SMTP session.
+    Used from one worker thread at a time; not thread-safe on its own.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, timeout=30, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._last_used = 0.0
+
+    def _open(self):
+        logger.info(f"🔐 Connecting to SMTP server {self.host}:{self.port}...")
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def _ensure_connected(self):
+        """
+        Reuse the open session unless the server has probably dropped it for idling.
+        """
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._server is None:
+            self._open()
+
+    def send(self, messages):
+        """
+        Send messages over the session, in order.
+        Returns how many were sent; raises on the first failure after closing
+        the session, so the next call reconnects.
+        """
+        self._ensure_connected()
+        sent = 0
+        try:
+            for msg in messages:
+                self._server.send_message(msg)
+                sent += 1
+        except Exception as e:
+            e.sent_count = sent
+            self.close()
+            raise
+        finally:
+            self._last_used = time.monotonic()
+        return sent
+
+    def close(self):
+        """
+        Politely end the session (errors are ignored).
+        """
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                try:
+                    self._server.close()
+                except Exception:
+                    pass
+            self._server = None
+
+
+class EmailNotifier:
+    """
+    Queue-fed email worker.
+    enqueue() never blocks the caller; the worker drains up to batch_size
+    queued messages (waiting batch_window seconds for a burst to build up) and
+    sends them over the shared SMTP session on the given I/O pool.
+    """
+
+    def __init__(self, session, pool, batch_size=20, batch_window=0.5,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0):
+        self.session = session
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue = None
+        self._task = None
+        self.sent = 0
+        self.failed = 0
+
+    async def start(self):
+        """
+        Start the background worker on the running event loop.
+        """
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker(), name="email-notifier")
+
+    def enqueue(self, msg):
+        """
+        Queue a message for delivery. Returns False if the worker is not running.
+        """
+        if self._queue is None:
+            logger.error("❌ Email notifier is not running; message not queued")
+            return False
+        self._queue.put_nowait(msg)
+        return True
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send_with_retry(self, batch):
+        attempt = 0
+        while batch:
+            try:
+                await self.pool.run(self.session.send, batch)
+                self.sent += len(batch)
+                logger.info(f"✅ Sent {len(batch)} order email(s)")
+                return
+            except smtplib.SMTPAuthenticationError as e:
+                logger.error(f"❌ Email authentication failed: {e}")
+                logger.error("❌ Check your EMAIL_PASSWORD or SUPPORT_EMAIL in .env file")
+                break
+            except Exception as e:
+                sent_count = getattr(e, 'sent_count', 0)
+                self.sent += sent_count
+                batch = batch[sent_count:]
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(f"❌ Giving up on {len(batch)} order email(s) after {self.max_retries} retries: {e}")
+                    break
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                logger.warning(f"⚠️ SMTP error ({type(e).__name__}: {e}); retry {attempt} in {delay:g}s")
+                await asyncio.sleep(delay)
+        self.failed += len(batch)
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._send_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self, timeout=30):
+        """
+        Wait (up to timeout seconds) for queued emails, then stop the worker
+        and close the SMTP session.
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ {self._queue.qsize()} order email(s) still queued at shutdown")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.pool.run(self.session.close)
+
+
+# One order as the owner sees it: the full message for individual delivery,
+# a short summary for digests, and the product list for emails.
+OrderNotice = namedtuple('OrderNotice', ['order_id', 'customer', 'customer_id', 'total', 'text', 'line', 'html'])
+
+
+class OwnerNotifier:
+    """
+    Order notifications for the owner, coalesced under load.
+
+    While at most digest_threshold orders arrived in the last rate_window
+    seconds, each order is sent on its own. Above that, orders are collected
+    and sent every digest_interval seconds as one digest message (split to
+    fit Telegram's size limit) and one digest email. Telegram sends take a
+    token from bucket first. A failed send is retried with the next digest,
+    so orders are never dropped.
+
+    send_message(text) is a coroutine function; send_email(notices) queues an
+    email for one or more notices and must not block.
+    """
+
+    def __init__(self, send_message, send_email, bucket, digest_threshold=10,
+                 rate_window=60.0, digest_interval=60.0, max_message_chars=4000):
+        self.send_message = send_message
+        self.send_email = send_email
+        self.bucket = bucket
+        self.digest_threshold = digest_threshold
+        self.rate_window = rate_window
+        self.digest_interval = digest_interval
+        self.max_message_chars = max_message_chars
+        self._queue = None
+        self._task = None
+        self._backlog = []  # notices received before start()
+        self._arrivals = deque()
+        self._digest = []  # notices not yet delivered on Telegram
+        self._unemailed = []  # digest notices waiting for the digest email
+        self._digest_due = None
+        self.sent_individually = 0
+        self.sent_in_digests = 0
+        self.digests_sent = 0
+
+    async def start(self):
+        """
+        Start the background worker on the running event loop.
+        """
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            for notice in self._backlog:
+                self._queue.put_nowait(notice)
+            self._backlog = []
+            self._task = asyncio.create_task(self._worker(), name="owner-notifier")
+
+    def notify(self, notice):
+        """
+        Queue an order notice. Never blocks and never drops the notice.
+        """
+        if self._queue is None:
+            self._backlog.append(notice)
+        else:
+            self._queue.put_nowait(notice)
+
+    @property
+    def pending(self):
+        queued = self._queue.qsize() if self._queue is not None else len(self._backlog)
+        return queued + len(self._digest)
+
+    @property
+    def coalescing(self):
+        """
+        True while orders arrive faster than digest_threshold per rate_window.
+        """
+        return len(self._arrivals) > self.digest_threshold
+
+    def _record_arrival(self):
+        now = time.monotonic()
+        self._arrivals.append(now)
+        while self._arrivals and self._arrivals[0] <= now - self.rate_window:
+            self._arrivals.popleft()
+
+    def _add_to_digest(self, notices, emailed):
+        if not self._digest:
+            self._digest_due = time.monotonic() + self.digest_interval
+        self._digest.extend(notices)
+        if not emailed:
+            self._unemailed.extend(notices)
+
+    def _email(self, notices):
+        try:
+            self.send_email(notices)
+        except Exception as e:
+            logger.error(f"❌ Failed to queue owner email for {len(notices)} order(s): {e}")
+
+    async def _send_single(self, notice):
+        self._email([notice])
+        try:
+            await self.send_message(notice.text)
+        except asyncio.CancelledError:
+            self._add_to_digest([notice], emailed=True)
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Owner notification for order {notice.order_id} failed ({e}); retrying in the next digest")
+            self._add_to_digest([notice], emailed=True)
+            return
+        self.sent_individually += 1
+        logger.info(f"Owner notified about order {notice.order_id}")
+
+    def _digest_messages(self, notices):
+        """
+        Split notices into digest texts of at most max_message_chars.
+        """
+        messages, lines, size = [], [], 0
+        for notice in notices:
+            if lines and size + len(notice.line) + 1 > self.max_message_chars - 100:
+                messages.append(lines)
+                lines, size = [], 0
+            lines.append(notice)
+            size += len(notice.line) + 1
+        if lines:
+            messages.append(lines)
+        total = len(messages)
+        texts = []
+        for part, batch in enumerate(messages, 1):
+            header = f"🔔 {len(batch)} NEW ORDERS"
+            if total > 1:
+                header += f" ({part}/{total})"
+            revenue = sum(notice.total for notice in batch)
+            texts.append((batch, f"{header}\n💰 TOTAL: ₹{revenue:.0f}\n\n" + "\n".join(n.line for n in batch)))
+        return texts
+
+    async def _flush_digest(self):
+        """
+        Send the collected notices as digest messages. Undelivered notices stay
+        in the digest for the next attempt.
+        """
+        digest, self._digest = self._digest, []
+        self._digest_due = None
+        if self._unemailed:
+            unemailed, self._unemailed = self._unemailed, []
+            self._email(unemailed)
+        parts = self._digest_messages(digest)
+        delivered = 0
+        try:
+            for batch, text in parts:
+                await self.bucket.acquire()
+                await self.send_message(text)
+                delivered += 1
+                self.digests_sent += 1
+                self.sent_in_digests += len(batch)
+                logger.info(f"Owner notified about {len(batch)} orders in a digest")
+        except Exception as e:
+            logger.warning(f"⚠️ Owner digest failed ({e}); keeping the rest for the next digest")
+        finally:
+            remaining = [notice for batch, _ in parts[delivered:] for notice in batch]
+            if remaining:
+                self._add_to_digest(remaining, emailed=True)
+
+    async def _worker(self):
+        while True:
+            timeout = None
+            if self._digest_due is not None:
+                timeout = max(0.0, self._digest_due - time.monotonic())
+            try:
+                notice = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush_digest()
+                continue
+            try:
+                self._record_arrival()
+                if not self._digest and not self.coalescing and self.bucket.try_acquire():
+                    await self._send_single(notice)
+                else:
+                    self._add_to_digest([notice], emailed=False)
+            finally:
+                self._queue.task_done()
+
+    async def stop(self, timeout=30):
+        """
+        Stop the worker and send everything still pending as a final digest
+        (giving up after timeout seconds).
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            self._add_to_digest([self._queue.get_nowait()], emailed=False)
+        if self._digest:
+            try:
+                await asyncio.wait_for(self._flush_digest(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self._digest:
+            logger.error(f"❌ {len(self._digest)} owner notification(s) could not be delivered at shutdown: "
+                         f"orders {', '.join(str(n.order_id) for n in self._digest)}")
@@ -0,0 +1,203 @@
+"""
+Order history shortcuts for the Telegram Order Bot
+Each customer's most recent orders and saved (named) carts, kept next to the
+order journal. Recent orders are updated in the same transaction that stores
+each order, so "🔁 Reorder Last" is one indexed lookup instead of a scan of
+the order history.
+
+Items are stored as JSON in the format Cart.from_items() reads
+([{'sku', 'product', 'quantity'}, ...]) without prices: a reordered cart is
+always rebuilt from the current catalog.
+"""
+
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from storage import JournalHook
+
+logger = logging.getLogger(__name__)
+
+RecentOrder = namedtuple('RecentOrder', ['order_id', 'date', 'items'])
+
+
+class CartLimitReached(Exception):
+    """
+    Raised when saving a new cart name would exceed the per-customer limit.
+    """
+
+
+class OrderHistory(JournalHook):
+    """
+    The last `keep` orders and up to `max_saved_carts` named carts per
+    customer. Registers itself as a commit hook of the given OrderJournal.
+    """
+
+    def __init__(self, journal, keep=3, max_saved_carts=10):
+        super().__init__(journal)
+        self.keep = keep
+        self.max_saved_carts = max_saved_carts
+
+    def create_schema(self, conn):
+        """
+        Create the tables; fill recent_orders from the journal when it is new
+        (first start after upgrading).
+        """
+        is_new = not self._has_table(conn, 'recent_orders')
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recent_orders (
+                id INTEGER PRIMARY KEY,
+                customer_id TEXT NOT NULL,
+                order_id INTEGER,
+                date TEXT NOT NULL,
+                items TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS recent_orders_customer ON recent_orders(customer_id, id)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS saved_carts (
+                customer_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                items TEXT NOT NULL,
+                saved_at TEXT NOT NULL,
+                PRIMARY KEY (customer_id, name)
+            )
+            """
+        )
+        if is_new:
+            self._backfill(conn)
+
+    def apply_order(self, conn, order, lines):
+        """
+        Remember the order as the customer's most recent one and forget the
+        oldest beyond `keep`. Called inside the journal's transaction.
+        """
+        customer_id = str(order['Customer ID'])
+        items = [
+            {'sku': line.get('SKU'), 'product': line['Product'], 'quantity': int(line['Quantity'])}
+            for line in lines
+        ]
+        conn.execute(
+            "INSERT INTO recent_orders (customer_id, order_id, date, items) VALUES (?, ?, ?, ?)",
+            (customer_id, order.get('Order ID'), str(order['Date']), json.dumps(items, ensure_ascii=False)),
+        )
+        self._prune(conn, customer_id)
+
+    def _prune(self, conn, customer_id):
+        conn.execute(
+            "DELETE FROM recent_orders WHERE customer_id = ? AND id <= "
+            "(SELECT id FROM recent_orders WHERE customer_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (customer_id, customer_id, self.keep),
+        )
+
+    def _backfill(self, conn):
+        """
+        Copy each customer's last `keep` orders from the journal, oldest first.
+        """
+        if not self._has_table(conn, 'order_lines'):
+            return
+        rows = conn.execute(
+            """
+            SELECT o.id, o.customer_id, o.order_id, o.date, l.sku, l.product, l.quantity
+            FROM (
+                SELECT id, customer_id, order_id, date,
+                       ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY id DESC) AS recent
+                FROM orders
+            ) o JOIN order_lines l ON l.order_ref = o.id
+            WHERE o.recent <= ?
+            ORDER BY o.id, l.line_no
+            """,
+            (self.keep,),
+        )
+        orders = {}
+        for ref, customer_id, order_id, date, sku, product, quantity in rows:
+            entry = orders.setdefault(ref, (customer_id, order_id, date, []))
+            entry[3].append({'sku': sku, 'product': product, 'quantity': quantity})
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO recent_orders (customer_id, order_id, date, items) VALUES (?, ?, ?, ?)",
+                [
+                    (customer_id, order_id, date, json.dumps(items, ensure_ascii=False))
+                    for customer_id, order_id, date, items in orders.values()
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"🔁 Recent orders indexed: {len(orders)} order(s)")
+
+    # -- lookups ---------------------------------------------------------------
+
+    def recent_orders(self, customer_id, limit=None):
+        """
+        [RecentOrder] for the customer, newest first.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT order_id, date, items FROM recent_orders WHERE customer_id = ? ORDER BY id DESC LIMIT ?",
+                (str(customer_id), limit or self.keep),
+            ).fetchall()
+        return [RecentOrder(order_id, date, json.loads(items)) for order_id, date, items in rows]
+
+    def last_order(self, customer_id):
+        """
+        The customer's most recent RecentOrder, or None.
+        """
+        orders = self.recent_orders(customer_id, limit=1)
+        return orders[0] if orders else None
+
+    # -- saved carts -----------------------------------------------------------
+
+    def saved_cart_names(self, customer_id):
+        """
+        Names of the customer's saved carts, most recently saved first.
+        """
+        with self._lock:
+            return [
+                row[0] for row in self._connect().execute(
+                    "SELECT name FROM saved_carts WHERE customer_id = ? ORDER BY saved_at DESC, name",
+                    (str(customer_id),),
+                )
+            ]
+
+    def saved_cart(self, customer_id, name):
+        """
+        Items of the named cart, or None.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT items FROM saved_carts WHERE customer_id = ? AND name = ?", (str(customer_id), name)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_cart(self, customer_id, name, items):
+        """
+        Save items under name, replacing a cart with the same name. Raises
+        CartLimitReached if the customer already has max_saved_carts others.
+        """
+        customer_id = str(customer_id)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                others = conn.execute(
+                    "SELECT COUNT(*) FROM saved_carts WHERE customer_id = ? AND name != ?", (customer_id, name)
+                ).fetchone()[0]
+                if others >= self.max_saved_carts:
+                    raise CartLimitReached(f"{customer_id} already has {others} saved carts")
+                conn.execute(
+                    "INSERT INTO saved_carts (customer_id, name, items, saved_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(customer_id, name) DO UPDATE SET items = excluded.items, saved_at = excluded.saved_at",
+                    (customer_id, name, json.dumps(items, ensure_ascii=False),
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,289 @@
+"""
+Persistent conversation state for the Telegram Order Bot
+Stores context.user_data (the cart) and the order conversation's states so they
+survive restarts.
+
+- StateStore is the storage interface; SQLiteStateStore implements it. A
+  Redis-compatible store would implement the same four methods (e.g. one hash
+  for user data and one per conversation).
+- BotPersistence plugs a StateStore into python-telegram-bot. The Application
+  hands it changed entries every update_interval seconds; they are buffered
+  and written in one transaction instead of one write per update.
+- User data is restored lazily: nothing is loaded at startup, and
+  refresh_user_data() fetches a user's data the first time they send an update.
+
+Several bot processes can share one store only with sticky routing: every
+update of a chat must reach the same process (e.g. hash the chat ID at the
+load balancer). Conversation states are loaded once at startup and user data
+once per user, so without it two processes overwrite each other's state.
+"""
+
+import asyncio
+import json
+import logging
+import pickle
+from collections import Counter, OrderedDict
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from storage import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    Storage interface for user data and conversation states.
+    """
+
+    def load_user_data(self, user_id):
+        """
+        Return the stored user data dict for user_id, or None.
+        """
+        raise NotImplementedError
+
+    def save_user_data(self, items):
+        """
+        Write {user_id: data} in one batch; a value of None deletes the entry.
+        """
+        raise NotImplementedError
+
+    def load_conversations(self, name):
+        """
+        Return {key: state} for the conversation handler called name.
+        """
+        raise NotImplementedError
+
+    def save_conversations(self, name, items):
+        """
+        Write {key: state} in one batch; a state of None ends the conversation.
+        """
+        raise NotImplementedError
+
+
+class SQLiteStateStore(SQLiteStore, StateStore):
+    """
+    StateStore backed by SQLite. User data is pickled, like PicklePersistence.
+    """
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                state BLOB NOT NULL,
+                PRIMARY KEY (name, key)
+            )
+            """
+        )
+
+    def load_user_data(self, user_id):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data FROM user_data WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def save_user_data(self, items):
+        upserts = [(user_id, pickle.dumps(data)) for user_id, data in items.items() if data is not None]
+        deletes = [(user_id,) for user_id, data in items.items() if data is None]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO user_data (user_id, data) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                    upserts,
+                )
+                conn.executemany("DELETE FROM user_data WHERE user_id = ?", deletes)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load_conversations(self, name):
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, state FROM conversations WHERE name = ?", (name,)
+            ).fetchall()
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    def save_conversations(self, name, items):
+        upserts = [(name, json.dumps(list(key)), pickle.dumps(state)) for key, state in items.items() if state is not None]
+        deletes = [(name, json.dumps(list(key))) for key, state in items.items() if state is None]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name, key) DO UPDATE SET state = excluded.state",
+                    upserts,
+                )
+                conn.executemany("DELETE FROM conversations WHERE name = ? AND key = ?", deletes)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+
+class BotPersistence(BasePersistence):
+    """
+    python-telegram-bot persistence on top of a StateStore.
+    Only user data and conversation states are stored; blocking store calls
+    run on the given BlockingIOPool. State is read once per process (see the
+    module docstring for running several processes).
+
+    Up to max_restored_users recently seen users are remembered as restored;
+    older ones are forgotten and their stored data is merged in again on their
+    next update, which never overwrites what is already in memory.
+    """
+
+    def __init__(self, store, pool, update_interval=10, max_restored_users=10000):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+        self.pool = pool
+        self._pending_user_data = {}
+        self._pending_conversations = {}
+        self._flush_task = None
+        self.max_restored_users = max_restored_users
+        self._restored_users = OrderedDict()  # user_id -> None, least recently seen first
+        # name -> {key: state} for conversations in progress (read by metrics)
+        self.conversation_states = {}
+
+    # -- loading -------------------------------------------------------------
+
+    async def get_user_data(self):
+        # Restored per user on their next update (see refresh_user_data)
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        # Conversation states are a few bytes each, so they are loaded in one query
+        conversations = await self.pool.run(self.store.load_conversations, name)
+        self.conversation_states[name] = dict(conversations)
+        logger.info(f"💾 Restored {len(conversations)} '{name}' conversation(s)")
+        return conversations
+
+    async def refresh_user_data(self, user_id, user_data):
+        """
+        Called before each update from user_id: on the user's first update in
+        this process, merge their stored data (cart etc.) into user_data.
+        """
+        if user_id in self._restored_users:
+            self._restored_users.move_to_end(user_id)
+            return
+        self._mark_restored(user_id)
+        if user_id in self._pending_user_data:
+            return
+        stored = await self.pool.run(self.store.load_user_data, user_id)
+        if stored:
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+
+    def _mark_restored(self, user_id):
+        self._restored_users[user_id] = None
+        self._restored_users.move_to_end(user_id)
+        while len(self._restored_users) > self.max_restored_users:
+            self._restored_users.popitem(last=False)
+
+    # -- batched writes ------------------------------------------------------
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        # The Application hands over all changed entries in one gather(); let it
+        # finish queueing them so they land in the same transaction.
+        await asyncio.sleep(0)
+        await self._write_pending()
+
+    async def _write_pending(self):
+        user_data, self._pending_user_data = self._pending_user_data, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        try:
+            if user_data:
+                await self.pool.run(self.store.save_user_data, user_data)
+            for name, items in conversations.items():
+                await self.pool.run(self.store.save_conversations, name, items)
+        except Exception as e:
+            logger.error(f"❌ Failed to persist conversation state: {e}")
+            # Keep the entries for the next run, without overwriting newer ones
+            for user_id, data in user_data.items():
+                self._pending_user_data.setdefault(user_id, data)
+            for name, items in conversations.items():
+                pending = self._pending_conversations.setdefault(name, {})
+                for key, state in items.items():
+                    pending.setdefault(key, state)
+
+    async def update_user_data(self, user_id, data):
+        self._mark_restored(user_id)
+        self._pending_user_data[user_id] = data
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id):
+        self._pending_user_data[user_id] = None
+        self._schedule_flush()
+
+    async def update_conversation(self, name, key, new_state):
+        states = self.conversation_states.setdefault(name, {})
+        if new_state is None:
+            states.pop(key, None)
+        else:
+            states[key] = new_state
+        self._pending_conversations.setdefault(name, {})[key] = new_state
+        self._schedule_flush()
+
+    def state_counts(self, name):
+        """
+        {state: number of conversations in it} for the conversation called name.
+        """
+        return Counter(self.conversation_states.get(name, {}).values())
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        """
+        Called on shutdown: write everything still buffered.
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self._write_pending()
@@ -0,0 +1,279 @@
+"""
+Rate limiting for the Telegram Order Bot
+A token bucket: tokens refill continuously at `rate` per second up to
+`capacity`; each send takes one. Short bursts up to `capacity` go out at once,
+sustained traffic is held to `rate`.
+
+TelegramRateLimiter puts every outgoing Bot API call behind a global bucket
+and a per-chat bucket. Calls waiting for the global bucket are served by
+priority (checkout before FAQ replies), and a 429 RetryAfter pauses all sends
+for the time Telegram asks before the call is retried.
+"""
+
+import asyncio
+import contextvars
+import enum
+import functools
+import heapq
+import itertools
+import logging
+import time
+import warnings
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.warnings import PTBDeprecationWarning
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after_seconds(error):
+    """
+    Seconds to wait after a RetryAfter. Its public retry_after is an int or a
+    timedelta depending on the python-telegram-bot version and settings.
+    """
+    with warnings.catch_warnings():
+        # 22.x warns that the int form will become a timedelta
+        warnings.simplefilter('ignore', PTBDeprecationWarning)
+        retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class TokenBucket:
+    """
+    Token bucket for one event loop (not thread-safe).
+    """
+
+    __slots__ = ('rate', 'capacity', '_tokens', '_updated')
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if they are available now. Returns True on success.
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens=1):
+        """
+        Seconds until `tokens` will be available (0 if they are now).
+        """
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens=1):
+        """
+        Wait until tokens are available, then take them.
+        """
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+
+class Priority(enum.IntEnum):
+    """
+    Send priority; lower values are sent first.
+    """
+    CHECKOUT = 0
+    NORMAL = 1
+    FAQ = 2
+    BACKGROUND = 3
+
+
+# Priority of calls made by the running handler, set with send_priority()
+_current_priority = contextvars.ContextVar('send_priority', default=Priority.NORMAL)
+
+
+def send_priority(priority):
+    """
+    Handler decorator: Bot API calls made while the handler runs use priority
+    (unless a call passes rate_limit_args={'priority': ...} itself).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _current_priority.set(priority)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current_priority.reset(token)
+        return wrapper
+    return decorator
+
+
+class TelegramRateLimiter(BaseRateLimiter):
+    """
+    Throttles Bot API calls to stay under Telegram's flood limits.
+
+    Calls with a chat_id first take a token from that chat's bucket (private
+    chats and groups have different limits), then one from the global bucket.
+    When the global bucket is empty, waiting calls are woken in priority
+    order. A RetryAfter pauses every send for retry_after seconds, then the
+    call is retried up to max_retries times; other errors are passed through.
+    """
+
+    # Endpoints that are not messages (or that the user is waiting on) skip the buckets
+    UNTHROTTLED = frozenset({'getMe', 'getUpdates', 'setWebhook', 'deleteWebhook', 'getWebhookInfo', 'getFile'})
+    # Idle per-chat buckets are dropped once this many chats have been seen
+    MAX_CHAT_BUCKETS = 4096
+
+    def __init__(self, global_rate=30.0, chat_rate=1.0, group_rate=20 / 60, chat_burst=3, max_retries=3):
+        # No global burst: sends are spaced evenly so no 1-second window exceeds global_rate
+        self.global_bucket = TokenBucket(global_rate, capacity=1)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets = {}
+        self._waiters = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+        self._dispatcher = None
+        self._resume_at = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.flood_wait_seconds = 0.0
+        self.sent_by_priority = {priority.name: 0 for priority in Priority}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, future in self._waiters:
+            future.cancel()
+        self._waiters = []
+
+    @property
+    def queue_depth(self):
+        """
+        Calls waiting for the global bucket.
+        """
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                self._chat_buckets = {
+                    key: b for key, b in self._chat_buckets.items() if b.tokens < b.capacity
+                }
+            # Group and channel IDs are negative
+            rate = self.group_rate if str(chat_id).startswith('-') else self.chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, capacity=self.chat_burst)
+        return bucket
+
+    async def _wait_out_pause(self):
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _take_global(self, priority):
+        if not self._waiters and self._resume_at <= time.monotonic() and self.global_bucket.try_acquire():
+            return False
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="telegram-rate-limiter")
+        await future
+        return True
+
+    async def _dispatch(self):
+        """
+        Hand out global tokens to waiting calls, highest priority first.
+        """
+        waiters = self._waiters
+        while waiters:
+            while waiters and waiters[0][2].done():
+                heapq.heappop(waiters)
+            if not waiters:
+                break
+            await self._wait_out_pause()
+            await self.global_bucket.acquire()
+            while waiters:
+                future = heapq.heappop(waiters)[2]
+                if not future.done():
+                    future.set_result(None)
+                    break
+
+    def _pause(self, retry_after):
+        resume_at = time.monotonic() + retry_after
+        if resume_at > self._resume_at:
+            self._resume_at = resume_at
+            self.flood_wait_seconds += retry_after
+            logger.warning(f"⚠️ Telegram flood limit hit; pausing sends for {retry_after:.0f}s")
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = (rate_limit_args or {}).get('priority', _current_priority.get())
+        chat_id = data.get('chat_id')
+        throttle = endpoint not in self.UNTHROTTLED
+        self.requests += 1
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            if throttle:
+                if chat_id is not None:
+                    bucket = self._chat_bucket(chat_id)
+                    if not bucket.try_acquire():
+                        self.throttled += 1
+                        await bucket.acquire()
+                if await self._take_global(priority):
+                    self.throttled += 1
+            # A RetryAfter may have arrived while this call waited for its tokens
+            await self._wait_out_pause()
+            if attempt == 0:
+                self.total_wait_seconds += time.monotonic() - started
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = retry_after_seconds(e) + 0.1
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error(f"❌ {endpoint} to {chat_id} still flood-limited after {attempt} retries")
+                    raise
+                self.retries += 1
+                self._pause(retry_after)
+                continue
+            self.sent_by_priority[Priority(priority).name] += 1
+            return result
+
+    def stats(self):
+        """
+        Snapshot of the limiter counters.
+        """
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'failed': self.failed,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'avg_wait_ms': (self.total_wait_seconds / self.requests * 1000) if self.requests else 0.0,
+            'flood_wait_seconds': self.flood_wait_seconds,
+            'chats_tracked': len(self._chat_buckets),
+            'sent_by_priority': dict(self.sent_by_priority),
+        }
@@ -0,0 +1,231 @@
+"""
+Sales statistics for the Telegram Order Bot
+Daily rollups by day, by product and by customer are kept next to the order
+journal and updated in the same transaction that stores each order, so the
+owner's /stats queries read a handful of buckets instead of every order.
+
+Usage:
+    python stats.py [orders.db] [days]      print a summary for the last N days
+    python stats.py rebuild [orders.db]     recompute all rollups from the journal
+"""
+
+import logging
+from datetime import date, timedelta
+
+from storage import JournalHook
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = ('stats_daily', 'stats_product_daily', 'stats_customer_daily')
+
+
+class SalesStats(JournalHook):
+    """
+    Rollup tables plus the queries behind /stats.
+    Registers itself as a commit hook of the given OrderJournal (same database
+    file), so every committed order updates the rollups atomically with the
+    order itself.
+    """
+
+    def create_schema(self, conn):
+        """
+        Create the rollup tables; fill them from the journal when they are new
+        (first start after upgrading).
+        """
+        existing = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'stats_%'"
+            )
+        }
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_daily (
+                day TEXT PRIMARY KEY,
+                orders INTEGER NOT NULL,
+                units INTEGER NOT NULL,
+                revenue REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_product_daily (
+                day TEXT NOT NULL,
+                product_key TEXT NOT NULL,
+                label TEXT NOT NULL,
+                units INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                PRIMARY KEY (day, product_key)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_customer_daily (
+                day TEXT NOT NULL,
+                customer_id TEXT NOT NULL,
+                username TEXT,
+                orders INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                PRIMARY KEY (day, customer_id)
+            )
+            """
+        )
+        if not existing.issuperset(ROLLUP_TABLES):
+            self._rebuild(conn)
+
+    def apply_order(self, conn, order, lines):
+        """
+        Add one order to the rollups. Called inside the journal's transaction.
+        """
+        day = str(order['Date'])[:10]
+        units = sum(int(line['Quantity']) for line in lines)
+        revenue = sum(float(line['Total']) for line in lines)
+        conn.execute(
+            "INSERT INTO stats_daily (day, orders, units, revenue) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET orders = orders + 1, units = units + excluded.units, "
+            "revenue = revenue + excluded.revenue",
+            (day, units, revenue),
+        )
+        conn.executemany(
+            "INSERT INTO stats_product_daily (day, product_key, label, units, revenue) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(day, product_key) DO UPDATE SET label = excluded.label, "
+            "units = units + excluded.units, revenue = revenue + excluded.revenue",
+            [
+                (day, line.get('SKU') or line['Product'], line['Product'], int(line['Quantity']), float(line['Total']))
+                for line in lines
+            ],
+        )
+        conn.execute(
+            "INSERT INTO stats_customer_daily (day, customer_id, username, orders, revenue) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT(day, customer_id) DO UPDATE SET username = excluded.username, "
+            "orders = orders + 1, revenue = revenue + excluded.revenue",
+            (day, str(order['Customer ID']), order.get('Username'), revenue),
+        )
+
+    def _rebuild(self, conn):
+        """
+        Recompute every rollup from the orders/order_lines tables in one transaction.
+        """
+        has_orders = self._has_table(conn, 'order_lines')
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            if has_orders:
+                conn.execute(
+                    """
+                    INSERT INTO stats_daily (day, orders, units, revenue)
+                    SELECT substr(o.date, 1, 10), COUNT(DISTINCT o.id), SUM(l.quantity), SUM(l.total)
+                    FROM orders o JOIN order_lines l ON l.order_ref = o.id
+                    GROUP BY substr(o.date, 1, 10)
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO stats_product_daily (day, product_key, label, units, revenue)
+                    SELECT substr(o.date, 1, 10), COALESCE(l.sku, l.product), MAX(l.product),
+                           SUM(l.quantity), SUM(l.total)
+                    FROM orders o JOIN order_lines l ON l.order_ref = o.id
+                    GROUP BY substr(o.date, 1, 10), COALESCE(l.sku, l.product)
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO stats_customer_daily (day, customer_id, username, orders, revenue)
+                    SELECT substr(o.date, 1, 10), o.customer_id, MAX(o.username), COUNT(*), SUM(o.total)
+                    FROM orders o
+                    GROUP BY substr(o.date, 1, 10), o.customer_id
+                    """
+                )
+            days = conn.execute("SELECT COUNT(*) FROM stats_daily").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"📈 Sales rollups rebuilt: {days} day(s)")
+        return days
+
+    def rebuild(self):
+        """
+        Recompute every rollup from the order journal (e.g. after editing orders by hand).
+        """
+        with self._lock:
+            return self._rebuild(self._connect())
+
+    # -- queries ---------------------------------------------------------------
+
+    def totals(self, day_from, day_to):
+        """
+        (orders, units, revenue) for the inclusive day range.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COALESCE(SUM(orders), 0), COALESCE(SUM(units), 0), COALESCE(SUM(revenue), 0) "
+                "FROM stats_daily WHERE day BETWEEN ? AND ?",
+                (day_from, day_to),
+            ).fetchone()
+        return row
+
+    def top_products(self, day_from, day_to, limit=5):
+        """
+        [(label, units, revenue)] by revenue for the inclusive day range.
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT MAX(label), SUM(units), SUM(revenue) FROM stats_product_daily "
+                "WHERE day BETWEEN ? AND ? GROUP BY product_key ORDER BY SUM(revenue) DESC LIMIT ?",
+                (day_from, day_to, limit),
+            ).fetchall()
+
+    def top_customers(self, day_from, day_to, limit=5):
+        """
+        [(customer_id, username, orders, revenue)] by revenue for the inclusive day range.
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT customer_id, MAX(username), SUM(orders), SUM(revenue) FROM stats_customer_daily "
+                "WHERE day BETWEEN ? AND ? GROUP BY customer_id ORDER BY SUM(revenue) DESC LIMIT ?",
+                (day_from, day_to, limit),
+            ).fetchall()
+
+    def summary(self, days=7, today=None):
+        """
+        Text report: today, the last `days` days, and top products/customers.
+        """
+        today = today or date.today()
+        start = (today - timedelta(days=days - 1)).isoformat()
+        today = today.isoformat()
+
+        orders, units, revenue = self.totals(today, today)
+        text = f"📊 SALES\n\nToday: {orders} orders, {units} units, ₹{revenue:.0f}\n"
+        orders, units, revenue = self.totals(start, today)
+        text += f"Last {days} days: {orders} orders, {units} units, ₹{revenue:.0f}\n"
+
+        products = self.top_products(start, today)
+        if products:
+            text += f"\n🏆 Top products ({days} days):\n"
+            for label, units, revenue in products:
+                text += f"  • {label}: {units} units, ₹{revenue:.0f}\n"
+        customers = self.top_customers(start, today)
+        if customers:
+            text += f"\n👥 Top customers ({days} days):\n"
+            for customer_id, username, orders, revenue in customers:
+                text += f"  • @{username or customer_id}: {orders} orders, ₹{revenue:.0f}\n"
+        return text
+
+
+if __name__ == '__main__':
+    import sys
+
+    from storage import OrderJournal
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    if args and args[0] == 'rebuild':
+        db_path = args[1] if len(args) > 1 else 'orders.db'
+        SalesStats(OrderJournal(db_path)).rebuild()
+    else:
+        db_path = args[0] if args else 'orders.db'
+        days = int(args[1]) if len(args) > 1 else 7
+        print(SalesStats(OrderJournal(db_path)).summary(days))
@@ -0,0 +1,472 @@
+"""
+Order and customer storage for the Telegram Order Bot
+Orders are appended to a SQLite journal running in WAL mode. A whole order -
+header and lines - is written in one transaction, so its cost depends only on
+its number of lines, never on how many orders are already stored. Customers
+are indexed in memory and upserted one row at a time.
+The Excel files are only exports built from the database.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Column order used for the journal and for the Excel export
+ORDER_COLUMNS = ['Order ID', 'Customer ID', 'Username', 'Product', 'Quantity', 'Price', 'Total', 'Date']
+
+# Column order used for the customer table and its Excel export
+CUSTOMER_COLUMNS = ['User ID', 'Name', 'Phone', 'Address', 'Last Order Date']
+
+# How long a connection waits for another process holding the write lock (ms)
+BUSY_TIMEOUT_MS = 5000
+
+
+class SQLiteStore:
+    """
+    Base class for stores kept in a SQLite database.
+    The connection is opened lazily on first use and shared between threads;
+    subclasses create their tables in _create_schema().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Open the database, switch it to WAL mode and create the schema.
+        synchronous=FULL makes SQLite fsync the WAL on every commit.
+        """
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._create_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    def _create_schema(self, conn):
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the underlying connection (it is reopened on next use).
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class OrderJournal(SQLiteStore):
+    """
+    Append-only order log stored in SQLite, normalized into an orders table
+    (one row per checkout) and an order_lines table (one row per product).
+
+    Commit hooks (JournalHook subclasses, e.g. stats.SalesStats) keep derived
+    tables in the same database: create_schema(conn) runs when the schema is
+    created, and apply_order(conn, order, lines) runs inside each order's
+    transaction.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._commit_hooks = []
+
+    def add_commit_hook(self, hook):
+        """
+        Register a hook (see the class docstring). Register hooks before the
+        journal is first used.
+        """
+        self._commit_hooks.append(hook)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER UNIQUE,
+                customer_id TEXT NOT NULL,
+                username TEXT,
+                total REAL NOT NULL,
+                date TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_lines (
+                order_ref INTEGER NOT NULL REFERENCES orders(id),
+                line_no INTEGER NOT NULL,
+                sku TEXT,
+                product TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                price REAL NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (order_ref, line_no)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS orders_date ON orders(date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS orders_customer ON orders(customer_id, date)")
+        self._migrate_order_rows(conn)
+        for hook in self._commit_hooks:
+            hook.create_schema(conn)
+
+    def _migrate_order_rows(self, conn):
+        """
+        One-time move of the old flat order_rows table (one row per product)
+        into orders/order_lines. Rows without an order ID are grouped by
+        customer and date. The old table is kept as order_rows_migrated.
+        """
+        has_old = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_rows'"
+        ).fetchone()
+        if not has_old:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_rows'"
+            ).fetchone():
+                conn.execute("ROLLBACK")
+                return
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(order_rows)")]
+            order_id_column = 'order_id' if 'order_id' in columns else 'NULL'
+            rows = conn.execute(
+                f"SELECT {order_id_column}, customer_id, username, product, quantity, price, total, date "
+                "FROM order_rows ORDER BY id"
+            ).fetchall()
+            grouped = {}
+            for row in rows:
+                order_id, customer_id, date = row[0], row[1], row[7]
+                key = ('id', order_id) if order_id is not None else ('legacy', customer_id, date)
+                grouped.setdefault(key, []).append(row)
+            for lines in grouped.values():
+                order_id, customer_id, username, _, _, _, _, date = lines[0]
+                cursor = conn.execute(
+                    "INSERT INTO orders (order_id, customer_id, username, total, date) VALUES (?, ?, ?, ?, ?)",
+                    (order_id, customer_id, username, sum(line[6] for line in lines), date),
+                )
+                conn.executemany(
+                    "INSERT INTO order_lines (order_ref, line_no, sku, product, quantity, price, total) "
+                    "VALUES (?, ?, NULL, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, line_no, line[3], line[4], line[5], line[6])
+                     for line_no, line in enumerate(lines, 1)],
+                )
+            conn.execute("ALTER TABLE order_rows RENAME TO order_rows_migrated")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"📦 Migrated {len(rows)} order rows into {len(grouped)} orders")
+
+    def commit_order(self, order, lines):
+        """
+        Write one order and all of its lines - plus the commit hooks' updates -
+        in a single transaction (one fsync): either the whole order is stored
+        or none of it is.
+        order uses the keys 'Order ID', 'Customer ID', 'Username' and 'Date';
+        each line uses 'SKU', 'Product', 'Quantity', 'Price' and 'Total'.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO orders (order_id, customer_id, username, total, date) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        order.get('Order ID'),
+                        str(order['Customer ID']),
+                        order.get('Username'),
+                        sum(float(line['Total']) for line in lines),
+                        order['Date'],
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO order_lines (order_ref, line_no, sku, product, quantity, price, total) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            cursor.lastrowid,
+                            line_no,
+                            line.get('SKU'),
+                            line['Product'],
+                            int(line['Quantity']),
+                            float(line['Price']),
+                            float(line['Total']),
+                        )
+                        for line_no, line in enumerate(lines, 1)
+                    ],
+                )
+                for hook in self._commit_hooks:
+                    hook.apply_order(conn, order, lines)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def iter_rows(self, date_from=None, date_to=None, customer_id=None, chunk_size=5000):
+        """
+        Stream order lines as lists of at most chunk_size tuples in
+        ORDER_COLUMNS order, oldest first. Dates are 'YYYY-MM-DD[ HH:MM:SS]'
+        strings; date_from is inclusive and date_to exclusive.
+
+        Uses its own read-only connection, so a long export sees one
+        consistent snapshot and never holds the lock checkout writes need.
+        """
+        self._connect()  # create/migrate the schema first
+        conditions, params = [], []
+        if date_from:
+            conditions.append("o.date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("o.date < ?")
+            params.append(date_to)
+        if customer_id is not None:
+            conditions.append("o.customer_id = ?")
+            params.append(str(customer_id))
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        conn = sqlite3.connect(Path(os.path.abspath(self.path)).as_uri() + "?mode=ro", uri=True)
+        try:
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            cursor = conn.execute(
+                "SELECT o.order_id, o.customer_id, o.username, l.product, l.quantity, l.price, l.total, o.date "
+                f"FROM orders o JOIN order_lines l ON l.order_ref = o.id {where}ORDER BY o.id, l.line_no",
+                params,
+            )
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            conn.close()
+
+    def export_to_excel(self, excel_file):
+        """
+        Rebuild the Excel file from the journal (streamed, see export.py).
+        Returns the number of exported rows.
+        """
+        from export import export_orders
+
+        return export_orders(self, excel_file)
+
+
+class JournalHook(SQLiteStore):
+    """
+    Base class for stores whose tables live in the order journal's database
+    and are updated inside its transactions. Registers itself as a commit
+    hook of the given OrderJournal; subclasses implement create_schema() and
+    apply_order().
+    """
+
+    def __init__(self, journal):
+        super().__init__(journal.path)
+        self.journal = journal
+        journal.add_commit_hook(self)
+
+    def _create_schema(self, conn):
+        # The journal's schema (and migration) first; it then calls create_schema()
+        self.journal._create_schema(conn)
+
+    @staticmethod
+    def _has_table(conn, name):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    # -- schema and writes (run on the journal's connection) -----------------
+
+    def create_schema(self, conn):
+        """
+        Create the hook's tables. Called when the journal creates its schema.
+        """
+        raise NotImplementedError
+
+    def apply_order(self, conn, order, lines):
+        """
+        Update the hook's tables for one order. Called inside the journal's
+        transaction; raising aborts the order.
+        """
+        raise NotImplementedError
+
+
+class OrderIdSequence(SQLiteStore):
+    """
+    Persistent, monotonic order ID allocator.
+    Each allocation is one UPDATE on a single-row counter inside an IMMEDIATE
+    transaction, so it never reads order history and two callers - threads or
+    separate worker processes sharing the database - never get the same ID.
+    """
+
+    NAME = 'order_id'
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sequences (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """
+        )
+
+    def _seed(self, conn):
+        """
+        Start the sequence after the highest order ID already in the journal.
+        Runs once, the first time the sequence is used on a database.
+        """
+        start = 0
+        # orders is the current layout; order_rows is the flat one it replaced
+        for table in ('orders', 'order_rows'):
+            has_table = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            if has_table:
+                columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+                if 'order_id' in columns:
+                    start = max(start, conn.execute(f"SELECT COALESCE(MAX(order_id), 0) FROM {table}").fetchone()[0])
+        conn.execute("INSERT INTO sequences (name, value) VALUES (?, ?)", (self.NAME, start))
+
+    def next_id(self):
+        """
+        Allocate and return the next order ID.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = conn.execute(
+                    "UPDATE sequences SET value = value + 1 WHERE name = ?", (self.NAME,)
+                ).rowcount
+                if not updated:
+                    self._seed(conn)
+                    conn.execute("UPDATE sequences SET value = value + 1 WHERE name = ?", (self.NAME,))
+                value = conn.execute(
+                    "SELECT value FROM sequences WHERE name = ?", (self.NAME,)
+                ).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return value
+
+
+class CustomerStore(SQLiteStore):
+    """
+    Customer repository with an in-memory index keyed by Telegram user ID.
+    All customers are loaded once; lookups are dict hits with no disk I/O and
+    saves are a single-row upsert.
+    """
+
+    def __init__(self, path, legacy_excel_file=None):
+        super().__init__(path)
+        self.legacy_excel_file = legacy_excel_file
+        self._customers = None
+
+    def _create_schema(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS customers (
+                user_id TEXT PRIMARY KEY,
+                name TEXT,
+                phone TEXT,
+                address TEXT,
+                last_order_date TEXT
+            )
+            """
+        )
+
+    def _import_legacy_excel(self, conn):
+        """
+        One-time import of customers.xlsx into an empty customer table.
+        """
+        if not self.legacy_excel_file or not os.path.exists(self.legacy_excel_file):
+            return
+        if conn.execute("SELECT 1 FROM customers LIMIT 1").fetchone():
+            return
+        import pandas as pd
+
+        df = pd.read_excel(self.legacy_excel_file, dtype={'User ID': str}).fillna('')
+        records = [
+            tuple(str(record.get(column, '')) for column in CUSTOMER_COLUMNS)
+            for record in df.to_dict('records')
+        ]
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?)", records)
+        conn.execute("COMMIT")
+        logger.info(f"📥 Imported {len(records)} customers from {self.legacy_excel_file}")
+
+    def load(self):
+        """
+        Build the in-memory index from the database (once).
+        """
+        with self._lock:
+            if self._customers is None:
+                conn = self._connect()
+                self._import_legacy_excel(conn)
+                self._customers = {
+                    row[0]: dict(zip(CUSTOMER_COLUMNS, row))
+                    for row in conn.execute("SELECT * FROM customers")
+                }
+                logger.info(f"👥 Loaded {len(self._customers)} customers")
+        return self._customers
+
+    def get(self, user_id):
+        """
+        Return the customer record for user_id, or None.
+        """
+        customers = self._customers if self._customers is not None else self.load()
+        customer = customers.get(str(user_id))
+        return dict(customer) if customer else None
+
+    def save(self, user_id, name, phone, address, last_order_date):
+        """
+        Insert or update a customer and refresh the index entry.
+        """
+        customers = self.load()
+        record = dict(zip(CUSTOMER_COLUMNS, (str(user_id), name, phone, address, last_order_date)))
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO customers (user_id, name, phone, address, last_order_date) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET name = excluded.name, phone = excluded.phone, "
+                "address = excluded.address, last_order_date = excluded.last_order_date",
+                tuple(record[column] for column in CUSTOMER_COLUMNS),
+            )
+            customers[record['User ID']] = record
+
+    def __len__(self):
+        return len(self.load())
+
+    def export_to_excel(self, excel_file):
+        """
+        Write all customers to an Excel file for the owner.
+        Returns the number of exported customers.
+        """
+        import pandas as pd
+
+        rows = list(self.load().values())
+        pd.DataFrame(rows, columns=CUSTOMER_COLUMNS).to_excel(excel_file, index=False)
+        logger.info(f"📤 Exported {len(rows)} customers to {excel_file}")
+        return len(rows)
+
+
+if __name__ == '__main__':
+    # Build the Excel exports on demand:
+    # python storage.py [orders.db] [orders.xlsx] [customers.xlsx]
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'orders.db'
+    excel_path = sys.argv[2] if len(sys.argv) > 2 else 'orders.xlsx'
+    customer_path = sys.argv[3] if len(sys.argv) > 3 else 'customers.xlsx'
+    OrderJournal(db_path).export_to_excel(excel_path)
+    CustomerStore(db_path).export_to_excel(customer_path)
@@ -0,0 +1,82 @@
+"""
+Concurrent update processing for the Telegram Order Bot
+Updates from different chats are handled concurrently (up to a worker limit),
+while updates from the same chat run strictly one after another in arrival
+order, so the PRODUCT -> QUANTITY -> ADD_MORE conversation never races itself.
+"""
+
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor with a global worker limit and per-chat ordering.
+
+    The chat lock is taken before python-telegram-bot's own semaphore
+    (max_pending_updates) and before a worker slot, so a chat with a backlog
+    of messages holds at most one of either and cannot starve other chats;
+    the rest of its backlog waits on the chat lock.
+    """
+
+    def __init__(self, max_concurrent_updates, max_pending_updates=None):
+        super().__init__(max_pending_updates or max_concurrent_updates * 16)
+        self.worker_limit = max_concurrent_updates
+        self._workers = None
+        # chat key -> [lock, number of updates holding or waiting for it]
+        self._chat_locks = {}
+
+    @staticmethod
+    def chat_key(update):
+        """
+        The key whose updates must be serialized: the chat, else the user.
+        """
+        if isinstance(update, Update):
+            if update.effective_chat is not None:
+                return update.effective_chat.id
+            if update.effective_user is not None:
+                return ('user', update.effective_user.id)
+        return None
+
+    @property
+    def active_chats(self):
+        """
+        Chats with an update running or waiting.
+        """
+        return len(self._chat_locks)
+
+    async def process_update(self, update, coroutine):
+        key = self.chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, preserving arrival order
+            async with entry[0]:
+                # Only now take a pending slot (the base class) and a worker slot
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        async with self._workers:
+            await coroutine
+
+    async def initialize(self):
+        # Created here so the semaphore belongs to the running event loop
+        self._workers = asyncio.BoundedSemaphore(self.worker_limit)
+
+    async def shutdown(self):
+        pass
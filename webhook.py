@@ -0,0 +1,108 @@
+"""
+Webhook mode for the Telegram Order Bot
+Runs an aiohttp server that receives updates from Telegram and feeds them into
+the Application's update queue. Unlike polling, several bot processes can sit
+behind one load balancer (which must route each chat to the same process, see
+persistence.py), and updates that arrive while the bot restarts stay queued on
+Telegram's side instead of being dropped.
+
+Local test (no Telegram involved):
+    curl -X POST -H "Content-Type: application/json" \
+         -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET_TOKEN" \
+         --data @update.json http://localhost:8443/telegram
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def create_webhook_app(application, path, secret_token):
+    """
+    Build the aiohttp app: POST <path> accepts one Update as JSON,
+    GET /healthz reports liveness for the load balancer. Every POST must
+    carry secret_token; an empty token is refused.
+    """
+    if not secret_token:
+        raise ValueError("a webhook secret token is required")
+    expected = secret_token.encode()
+
+    async def handle_update(request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, '').encode(), expected):
+            logger.warning(f"⚠️ Rejected webhook call with bad secret token from {request.remote}")
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400, text="invalid JSON")
+        if not isinstance(data, dict):
+            return web.Response(status=400, text="expected an Update object")
+        try:
+            update = Update.de_json(data, application.bot)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Rejected malformed update from {request.remote}: {e}")
+            return web.Response(status=400, text="malformed Update")
+        await application.update_queue.put(update)
+        return web.Response()
+
+    async def healthz(request):
+        return web.json_response({'running': application.running})
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get('/healthz', healthz)
+    return app
+
+
+async def run_webhook(application, host, port, path, secret_token, webhook_url=None):
+    """
+    Start the Application and the webhook server, and run until SIGINT/SIGTERM.
+    If webhook_url (the public base URL) is set, the webhook is registered with
+    Telegram on startup, keeping any updates that are already pending.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on Windows event loops; Ctrl+C raises KeyboardInterrupt instead
+            pass
+
+    runner = web.AppRunner(create_webhook_app(application, path, secret_token))
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url.rstrip('/') + path,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=False,
+            )
+            logger.info(f"🌐 Webhook registered at {webhook_url.rstrip('/')}{path}")
+
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"🌐 Listening for updates on http://{host}:{port}{path}")
+        await stop_event.wait()
+    finally:
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)